@@ -0,0 +1,122 @@
+# SPDX-License-Identifier: MIT
+"""
+MIDI note to sound latency benchmark.
+
+Runs code.py on the host with ``midi_notes`` on, once with the synth
+drums and once in oneshot mode, and injects drum note-ons (GM 36, 38 and
+42 at varied velocities) into the usb_midi stand-in every 100 to 200 ms.
+The stand-ins time each note through the host event log:
+
+* ``midi_in``  the bytes are available to usb_midi
+* ``press``    the voice is triggered (synth press or mixer voice play)
+* ``sound``    the audio thread first renders the triggered note
+
+and latency percentiles are printed in ms for in->press and in->sound.
+
+    python benchmarks/midi_latency.py --json latency.json
+
+The audio thread pulls a mixer buffer at a time, so in->sound follows
+the latency profile chosen with ``--profile`` (see latency.py).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import hostsim  # pylint: disable=wrong-import-position
+
+NOTES = (36, 38, 42)
+MODES = (("synth", False), ("oneshot", True))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def _player(stop, seed, warmup):
+    """Inject a note-on every 100 to 200 ms until stop is set."""
+    rng = random.Random(seed)
+    stop.wait(warmup)
+    import usb_midi  # pylint: disable=import-outside-toplevel
+    port = usb_midi.ports[0]
+    while not stop.is_set():
+        # Channel 10, as drum machines send, with running status off
+        port.inject(bytes((0x99, rng.choice(NOTES), rng.randint(20, 127))))
+        stop.wait(rng.uniform(0.1, 0.2))
+
+
+def pair(events):
+    """in->press and in->sound delays in ms: for each midi_in, the first
+    press and the first sound logged before the next midi_in."""
+    press = []
+    sound = []
+    start = None
+    for kind, t in events:
+        if kind == "midi_in":
+            start = t
+            pressed = False
+        elif start is None:
+            continue
+        elif kind == "press" and not pressed:
+            press.append((t - start) / 1e6)
+            pressed = True
+        elif kind == "sound" and pressed:
+            sound.append((t - start) / 1e6)
+            start = None
+    return press, sound
+
+
+def bench_mode(oneshot, seconds, profile="safe", seed=0, warmup=1.5):
+    events = []
+    stop = threading.Event()
+    player = threading.Thread(target=_player, args=(stop, seed, warmup), daemon=True)
+    player.start()
+    try:
+        result = hostsim.run("code.py", seconds=seconds, events=events,
+                             settings={"midi_notes": True, "oneshot_mode": oneshot,
+                                       "latency_profile": profile})
+    finally:
+        stop.set()
+        player.join()
+    press, sound = pair(events)
+    results = {"notes": len(press), "hits": result["globals"]["notes_in"].hits,
+               "audio_underruns": result["underruns"]}
+    for name, values in (("in_press", press), ("in_sound", sound)):
+        for label, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            results["{}_{}_ms".format(name, label)] = round(percentile(values, fraction), 2)
+        results["{}_max_ms".format(name)] = round(max(values, default=0), 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0].strip())
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--seconds", type=float, default=8, help="how long to run each mode")
+    parser.add_argument("--profile", default="safe", help="latency profile: low, balanced or safe")
+    args = parser.parse_args()
+
+    results = {}
+    for name, oneshot in MODES:
+        results[name] = bench_mode(oneshot, args.seconds, args.profile)
+
+    for section, values in results.items():
+        print(section)
+        for name, value in values.items():
+            print("  {:24s} {}".format(name, value))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
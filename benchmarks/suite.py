@@ -0,0 +1,348 @@
+# SPDX-License-Identifier: MIT
+"""
+Benchmark suite.
+
+Measures, on the host with the hostsim stand-ins:
+
+* step lateness of the code.py sequencer loop (percentiles in us)
+* refresh time of playhead-only frames at 300 BPM in 16ths, against
+  code.py's playhead_budget_ns
+* time and allocated bytes per grid toggle (``seq.toggle`` + ``updateUI``)
+* WaveBuilder table build time per shape and table length
+* WaveViz full plot and partial redraw time per width
+* native calls (refresh, gc, scope frame) longer than an audio buffer,
+  per latency profile
+* audio render time per buffer with a Synthesizer per drum against one
+  shared through voicepool.VoicePool, idle and playing
+* import time of drums.py (first boot, building its tables, and later
+  boots, reading them) and boot time of code.py up to its main loop
+
+Results are printed and can be written as JSON. Given a previous JSON
+file, every timing more than ``--tolerance`` slower than it is reported
+and the exit status is 1.
+
+    python benchmarks/suite.py --json after.json --compare before.json
+
+Host timings are not board timings, but they move together: a change that
+makes a section slower here is worth checking on the device.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import hostsim  # pylint: disable=wrong-import-position
+
+hostsim.install()
+
+# pylint: disable=wrong-import-position
+import ulab.numpy as np
+from cedargrove_wavebuilder import WaveBuilder, WaveShape
+from cedargrove_waveviz import WaveViz
+import wavebuilder_bench
+import latency
+import voicepool
+import audiomixer
+import synthio
+import drums
+
+SHAPES = (WaveShape.Sine, WaveShape.Square, WaveShape.Saw, WaveShape.Triangle)
+TABLE_LENGTHS = (256, 1024, 4096)
+VIZ_WIDTHS = (60, 120, 240)
+TOGGLES = 2000
+RENDER_BLOCKS = 400
+RENDER_BLOCK = 512  # Samples, the balanced profile's buffer
+BOOTS = 3
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def bench_sequencer(seconds):
+    """Run code.py and read its clock's lateness ring. Returns the result
+    and the script's globals for the toggle benchmark."""
+    result = hostsim.run("code.py", seconds=seconds)
+    code = result["globals"]
+    clock = code["clock"]
+    n = min(clock.count, len(clock.lateness))
+    late = [clock.lateness[i] for i in range(n)]
+    return {
+        "steps": clock.count,
+        "skipped": clock.total_skipped,
+        "late_mean_us": sum(late) // max(n, 1),
+        "late_p50_us": percentile(late, 0.5),
+        "late_p90_us": percentile(late, 0.9),
+        "late_p99_us": percentile(late, 0.99),
+        "late_max_us": clock.late_max,
+        "audio_underruns": result["underruns"],
+    }, code
+
+
+def bench_latency(seconds):
+    """Run code.py under each latency profile and count the native calls
+    that outlasted its audio buffer."""
+    results = {}
+    for name, profile in latency.PROFILES.items():
+        result = hostsim.run("code.py", seconds=seconds, settings={"latency_profile": name})
+        stalls = result["globals"]["stalls"]
+        results["buffer_ms.{}".format(name)] = round(profile.buffer_ms(), 1)
+        results["stalls.{}".format(name)] = stalls.stalls
+        results["call_max_ms.{}".format(name)] = stalls.max_ms
+        results["underruns.{}".format(name)] = result["underruns"]
+    return results
+
+
+def _render_us(mixer, hit, blocks, every):
+    """Mean us to render a mixer buffer, calling hit(i) every few blocks."""
+    total = 0
+    for i in range(blocks):
+        if every and i % every == 0:
+            hit(i // every)
+        start = time.perf_counter_ns()
+        mixer.read(RENDER_BLOCK)
+        total += time.perf_counter_ns() - start
+    return total / blocks / 1000
+
+
+def bench_voices(blocks=RENDER_BLOCKS, sample_rate=24000):
+    """The same hits rendered by three Synthesizers on three mixer voices,
+    as code.py used to, and by one Synthesizer shared through a VoicePool.
+    Hits land every other buffer, cycling through the kit, with all three
+    together every fourth."""
+    results = {}
+    for setup in ("separate", "pooled"):
+        for every, label in ((0, "idle"), (2, "playing")):
+            mixer = audiomixer.Mixer(voice_count=3, channel_count=1, sample_rate=sample_rate)
+            if setup == "separate":
+                synths = [synthio.Synthesizer(channel_count=1, sample_rate=sample_rate) for _ in range(3)]
+                kit = (drums.Snare(synths[0]), drums.HighHat(synths[1]), drums.KickDrum(synths[2]))
+                for i, synth in enumerate(synths):
+                    mixer.voice[i].play(synth)
+                play = [kit[i].play for i in range(3)]
+            else:
+                synth = synthio.Synthesizer(channel_count=1, sample_rate=sample_rate)
+                pool = voicepool.VoicePool(synth, (drums.Snare(synth), drums.HighHat(synth),
+                                                   drums.KickDrum(synth)), priorities=(1, 0, 2))
+                mixer.voice[0].play(synth)
+                play = [lambda i=i: pool.play(i) for i in range(3)]
+
+            def hit(n, play=play):
+                if n % 4 == 3:
+                    for p in play:
+                        p()
+                else:
+                    play[n % 3]()
+
+            results["render_us.{}.{}".format(setup, label)] = round(_render_us(mixer, hit, blocks, every), 1)
+            if setup == "pooled":
+                results["peak_channels.{}".format(label)] = pool.peak
+    return results
+
+
+def bench_playhead(seconds):
+    """Run code.py at 300 BPM in 16ths, a few cells set, and time the
+    frames in which only the playhead moved."""
+    import refresh  # pylint: disable=import-outside-toplevel
+    result = hostsim.run("code.py", seconds=seconds, keys="0.3:eyzvbs",
+                         settings={"bpm": 300, "steps_per_beat": 4})
+    code = result["globals"]
+    refresher = code["refresher"]
+    worst = refresher.worst_alone(refresh.PLAYHEAD)
+    return {
+        "steps": code["clock"].count,
+        "frames": refresher.alone_count[refresh.PLAYHEAD.bit_length() - 1],
+        "playhead_mean_us": refresher.mean_alone_us(refresh.PLAYHEAD),
+        "playhead_max_us": worst // 1000,
+        "budget_ns": code["playhead_budget_ns"],
+        "over_budget": int(worst > code["playhead_budget_ns"]),
+    }
+
+
+def bench_toggle(code, count=TOGGLES):
+    """Time and traced allocations per toggle, as handle_kbInput applies one."""
+    seq = code["seq"]
+    update_ui = code["updateUI"]
+    cells = [(t, s) for t in range(seq.tracks) for s in range(seq.steps)]
+
+    start = time.perf_counter_ns()
+    for i in range(count):
+        track, step = cells[i % len(cells)]
+        seq.toggle(track, step)
+        update_ui(track, step)
+    elapsed = time.perf_counter_ns() - start
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for i in range(count):
+        track, step = cells[i % len(cells)]
+        seq.toggle(track, step)
+        update_ui(track, step)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "toggle_us": elapsed / count / 1000,
+        "toggle_retained_bytes": (after - before) / count,
+        "toggle_peak_bytes": peak - before,
+    }
+
+
+def bench_wavebuilder(lengths=TABLE_LENGTHS, shapes=SHAPES):
+    results = {}
+    for shape in shapes:
+        for length in lengths:
+            oscs = wavebuilder_bench.oscillator_list(4, shape)
+            build_us, _ = wavebuilder_bench.build_time_us(WaveBuilder, oscs, length)
+            results["build_us.{}.{}".format(shape, length)] = build_us
+    return results
+
+
+def bench_waveviz(widths=VIZ_WIDTHS, repeat=5):
+    """Full plot (construction) and partial redraw (a new table) per width."""
+    a = WaveBuilder(wavebuilder_bench.oscillator_list(4), 1024, use_cache=False).wave_table
+    b = WaveBuilder(wavebuilder_bench.oscillator_list(2), 1024, use_cache=False).wave_table
+    results = {}
+    for width in widths:
+        plot = redraw = None
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            viz = WaveViz(a, 0, 0, width, width // 2)
+            elapsed = time.perf_counter_ns() - start
+            plot = elapsed if plot is None else min(plot, elapsed)
+
+            start = time.perf_counter_ns()
+            viz.wave_table = b
+            elapsed = time.perf_counter_ns() - start
+            redraw = elapsed if redraw is None else min(redraw, elapsed)
+        results["plot_us.{}".format(width)] = plot // 1000
+        results["redraw_us.{}".format(width)] = redraw // 1000
+    return results
+
+
+# Each boot runs in a fresh interpreter so nothing is already imported
+_IMPORT_DRUMS = """
+import sys, time
+sys.path.insert(0, {root!r})
+import hostsim
+hostsim.install()
+import ulab.numpy, synthio
+start = time.perf_counter_ns()
+import drums
+print((time.perf_counter_ns() - start) // 1000)
+"""
+
+# code.py up to the point it enters its main loop
+_BOOT_CODE = """
+import sys, time, asyncio
+sys.path.insert(0, {root!r})
+start = time.perf_counter_ns()
+import hostsim
+asyncio.run = lambda main: main.close()
+hostsim.run("code.py", cwd={cwd!r})
+print((time.perf_counter_ns() - start) // 1000)
+"""
+
+
+def _child_us(source, cwd):
+    out = subprocess.run([sys.executable, "-c", source], cwd=cwd, check=True,
+                         capture_output=True, text=True).stdout
+    return int(out.split()[-1])
+
+
+def bench_boot(boots=BOOTS):
+    results = {}
+    cold = warm = boot = None
+    for _ in range(boots):
+        with tempfile.TemporaryDirectory() as cwd:
+            # No drum_tables.bin yet: the noise tables are generated and saved
+            source = _IMPORT_DRUMS.format(root=ROOT)
+            us = _child_us(source, cwd)
+            cold = us if cold is None else min(cold, us)
+            us = _child_us(source, cwd)
+            warm = us if warm is None else min(warm, us)
+            us = _child_us(_BOOT_CODE.format(root=ROOT, cwd=cwd), cwd)
+            boot = us if boot is None else min(boot, us)
+    results["import_drums_first_us"] = cold
+    results["import_drums_us"] = warm
+    results["boot_code_us"] = boot
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Timings (keys ending in _us) slower than baseline by more than tolerance."""
+    slower = []
+    for section, values in results.items():
+        for name, value in values.items():
+            old = baseline.get(section, {}).get(name)
+            if not name.endswith("_us") and "_us." not in name:
+                continue
+            if old and value > old * (1 + tolerance):
+                slower.append("{}.{}: {} -> {}".format(section, name, old, value))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0].strip())
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="report timings slower than this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--seconds", type=float, default=8, help="how long to run the sequencer")
+    parser.add_argument("--skip", default="", help="comma separated sections to skip")
+    args = parser.parse_args()
+    skip = set(args.skip.split(","))
+
+    results = {"host": {"python": sys.version.split()[0], "platform": sys.platform,
+                        "numpy": np.__version__}}
+    if "sequencer" not in skip or "toggle" not in skip:
+        # The toggle section times the state the sequencer run leaves
+        sequencer, code = bench_sequencer(args.seconds)
+        if "sequencer" not in skip:
+            results["sequencer"] = sequencer
+        if "toggle" not in skip:
+            results["toggle"] = bench_toggle(code)
+    if "playhead" not in skip:
+        results["playhead"] = bench_playhead(args.seconds / 2)
+    if "wavebuilder" not in skip:
+        results["wavebuilder"] = bench_wavebuilder()
+    if "waveviz" not in skip:
+        results["waveviz"] = bench_waveviz()
+    if "voices" not in skip:
+        results["voices"] = bench_voices()
+    if "latency" not in skip:
+        results["latency"] = bench_latency(args.seconds / 2)
+    if "boot" not in skip:
+        results["boot"] = bench_boot()
+
+    for section, values in results.items():
+        print(section)
+        for name, value in values.items():
+            print("  {:32s} {}".format(name, round(value, 2) if isinstance(value, float) else value))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for line in slower:
+            print("slower:", line)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
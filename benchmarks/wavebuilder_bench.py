@@ -0,0 +1,151 @@
+# SPDX-License-Identifier: MIT
+"""
+WaveBuilder table build benchmark.
+
+Times WaveBuilder table construction for table lengths of 256 to 8192
+samples and 1 to 16 oscillators, using the current shape generators
+("after") and the original grow-by-concatenation generators ("before").
+Also checks that the square, saw and triangle output is unchanged.
+
+Runs on the device (copy to CIRCUITPY and ``import wavebuilder_bench``)
+or on a host with the CircuitPython stand-ins on the path.
+"""
+
+import random
+import sys
+import time
+
+import ulab.numpy as np
+
+sys.path.append("/lib")
+sys.path.append("lib")
+from cedargrove_wavebuilder import WaveBuilder, WaveShape
+
+LENGTHS = (256, 512, 1024, 2048, 4096, 8192)
+OSCILLATOR_COUNTS = (1, 2, 4, 8, 16)
+SHAPES = (WaveShape.Sine, WaveShape.Square, WaveShape.Saw, WaveShape.Triangle)
+REPEAT = 3
+
+
+class LegacyWaveBuilder(WaveBuilder):
+    """WaveBuilder with the original shape generators, for comparison."""
+
+    # pylint: disable=unused-argument
+    def _noise_wave(self, ratio, amplitude):
+        amp_factor = abs(
+            min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
+        )
+        return np.array(
+            [
+                random.randint(-amp_factor, amp_factor)
+                for _ in range(self._table_length)
+            ],
+            dtype=np.int16,
+        )
+
+    def _saw_wave(self, ratio, amplitude):
+        amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
+        _temporary = np.array([], dtype=np.int16)
+        half_lambda = int((self._table_length / (self._lambda_factor * 2)) / ratio)
+        while len(_temporary) < self._table_length:
+            _temporary = np.concatenate(
+                (
+                    _temporary,
+                    np.linspace(0, int(amp_factor), half_lambda - 1, dtype=np.int16),
+                    np.array([0], dtype=np.int16),
+                    np.linspace(int(-amp_factor), 0, half_lambda - 1, dtype=np.int16),
+                )
+            )
+        return _temporary[: self._table_length]
+
+    def _square_wave(self, ratio, amplitude):
+        amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
+        _temporary = np.array([], dtype=np.int16)
+        half_lambda = int((self._table_length / (self._lambda_factor * 2)) / ratio)
+        while len(_temporary) < self._table_length:
+            _temporary = np.concatenate(
+                (
+                    _temporary,
+                    np.array([0], dtype=np.int16),
+                    np.ones(half_lambda - 1, dtype=np.int16) * int(amp_factor),
+                    np.array([0], dtype=np.int16),
+                    np.ones(half_lambda - 1, dtype=np.int16) * int(-amp_factor),
+                )
+            )
+        return _temporary[: self._table_length]
+
+    def _triangle_wave(self, ratio, amplitude):
+        amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
+        _temporary = np.array([], dtype=np.int16)
+        quarter_lambda = int((self._table_length / (self._lambda_factor * 4)) / ratio)
+        increment = int(amp_factor / quarter_lambda)
+        while len(_temporary) < self._table_length:
+            _temporary = np.concatenate(
+                (
+                    _temporary,
+                    np.linspace(0, amp_factor, quarter_lambda, dtype=np.int16),
+                    np.linspace(amp_factor - increment, 0, quarter_lambda, dtype=np.int16),
+                    np.linspace(0 - increment, -amp_factor, quarter_lambda, dtype=np.int16),
+                    np.linspace(
+                        -amp_factor + increment, 0 - increment, quarter_lambda, dtype=np.int16
+                    ),
+                )
+            )
+        return _temporary[: self._table_length]
+
+
+def oscillator_list(count, shape=None):
+    """count oscillators on harmonics 1..count with equal amplitudes. Cycles
+    through the deterministic shapes unless a single shape is given."""
+    amplitude = 0.99 / count
+    oscs = []
+    for i in range(count):
+        oscs.append((shape or SHAPES[i % len(SHAPES)], float(i + 1), amplitude))
+    return oscs
+
+
+def build_time_us(builder_class, oscillators, length):
+    """Best of REPEAT build times in microseconds, and the last table."""
+    best = None
+    table = None
+    for _ in range(REPEAT):
+        start = time.monotonic_ns()
+        table = builder_class(oscillators, length, use_cache=False).wave_table
+        elapsed = (time.monotonic_ns() - start) // 1000
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, table
+
+
+def run(lengths=LENGTHS, counts=OSCILLATOR_COUNTS, shapes=(None,) + SHAPES):
+    """Returns a list of result dicts and prints a table as it goes."""
+    results = []
+    print("shape     length  oscs  before_us  after_us  speedup  same")
+    for shape in shapes:
+        for length in lengths:
+            for count in counts:
+                oscs = oscillator_list(count, shape)
+                before, old = build_time_us(LegacyWaveBuilder, oscs, length)
+                after, new = build_time_us(WaveBuilder, oscs, length)
+                same = list(old) == list(new)
+                results.append(
+                    {
+                        "shape": shape or "mixed",
+                        "table_length": length,
+                        "oscillators": count,
+                        "before_us": before,
+                        "after_us": after,
+                        "identical": same,
+                    }
+                )
+                print(
+                    "{:9s} {:6d} {:5d} {:10d} {:9d} {:7.1f}x  {}".format(
+                        shape or "mixed", length, count, before, after,
+                        before / max(after, 1), same,
+                    )
+                )
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -5,14 +5,18 @@ import audiobusio
 import synthio
 import audiomixer
 import drums
+import scheduler
+import pattern
+import refresh
+import latency
+import voicepool
+# oneshot, scope, midi and profiler are imported where their feature is
+# turned on below, so a feature that is off costs no heap
 
 
 
 import displayio
-import terminalio
-from adafruit_display_text import label
-from adafruit_displayio_layout.layouts.grid_layout import GridLayout
-from adafruit_display_shapes.circle import Circle
+import stepgrid
 
 
 
@@ -21,6 +25,42 @@ mix_vol = 0.2 # Mixer Volume
 
 
 debug_enabled = False
+
+# Play pre-rendered drum one-shots from the mixer instead of running a
+# live Synthesizer per drum
+oneshot_mode = False
+
+# Live scope and level meters under the grid (needs oneshot_mode)
+scope_enabled = False
+
+# Time the hot path functions; the = key dumps the records over serial
+# for hostsim/profdecode.py. Off, nothing is wrapped and nothing is paid.
+profiling_enabled = False
+
+# Allocation free loop: a millisecond tick clock, no coroutine created per
+# step, and gc.collect() only after the step with the most slack in each
+# bar. The scope draws with ulab arrays, so it stays off in this mode.
+# Only the main loop is allocation free: the MIDI tasks still read
+# time.monotonic_ns(), and run while it sleeps.
+alloc_free = False
+if alloc_free:
+    scope_enabled = False
+
+# MIDI clock over USB: "internal" runs from bpm alone, "follow" takes the
+# tempo and start/stop from incoming clock, "master" sends clock, start
+# and stop out. Space starts and stops the sequencer unless following.
+midi_clock = "internal"
+playing = midi_clock != "follow"
+
+# Audio buffering: "low", "balanced" or "safe" (see latency.py). Smaller
+# buffers make hits sound sooner but underrun sooner under load. Display
+# refreshes, collections and scope frames long enough to starve the
+# buffer are counted, and printed with debug_enabled.
+latency_profile = "safe"
+
+# Play the kit from a MIDI controller: note-ons on the USB MIDI input
+# trigger the voices at once, outside the step loop
+midi_notes = False
 # Display Setup
 
 def dPrint(msg):
@@ -32,6 +72,9 @@ display = board.DISPLAY
 main_group = displayio.Group()
 display.root_group = main_group
 
+# Refresh only when something changed, in the slack between steps
+refresher = refresh.Refresher(display, max_fps=20, log=dPrint if debug_enabled else None, ticks=alloc_free)
+
 h = 135
 w = 240
 
@@ -70,25 +113,24 @@ input_map = {
 
 audio = audiobusio.I2SOut(bit_clock=board.I2S_BIT_CLOCK, word_select=board.I2S_WORD_SELECT, data=board.I2S_DATA)
 
-samp_rate = 24000
+audio_profile = latency.PROFILES[latency_profile]
+samp_rate = audio_profile.sample_rate
 
 mixer  = audiomixer.Mixer(
                 voice_count=3,
                 channel_count=1,
                 sample_rate=samp_rate,
-                buffer_size=1024*4)
+                buffer_size=audio_profile.buffer_size)
 
 synth  = synthio.Synthesizer(
                 channel_count=1,
                 sample_rate=samp_rate)
 
-synth1 = synthio.Synthesizer(
-                channel_count=1,
-                sample_rate=samp_rate)
-
-synth2 = synthio.Synthesizer(
-                channel_count=1,
-                sample_rate=samp_rate)
+# In oneshot mode the synth only hosts the drum Notes and filters for
+# rendering and is never played; otherwise all three drums share it
+snare = drums.Snare(synth)
+kick = drums.KickDrum(synth)
+hh = drums.HighHat(synth)
 
 
 
@@ -97,120 +139,116 @@ audio.play(mixer)
 
 
 
-# Add Synths to Mixer and set Volume
-mixer.voice[0].play(synth)
-mixer.voice[1].play(synth1)
-mixer.voice[2].play(synth2)
-
-
-
-mixer.voice[0].level = mix_vol
-mixer.voice[1].level = mix_vol
-mixer.voice[2].level = mix_vol
-
-snare = drums.Snare(synth)
-kick = drums.KickDrum(synth1)
-hh = drums.HighHat(synth2)
+if oneshot_mode:
+    import oneshot
 
+    # Rendered buffers are kept by voice settings, so flipping back to a
+    # previous decay/filter setting does not render again
+    render_cache = oneshot.RenderCache(budget=40 * 1024)
 
-bpm = 240	
-delVal = 60/bpm
+    # Rebuilds the mixer output from the hits for the scope, trailing them
+    # by the mixer's buffering
+    tap = None
+    if scope_enabled:
+        import scope
+        tap = scope.AudioTap(3, samp_rate, delay_ns=int(audio_profile.buffer_ms() * 1_000_000))
 
-seq = [
-        [0,0,0,0,0,0,0,0], # Snare
-        [0,0,0,0,0,0,0,0], # Hi Hat
-        [0,0,0,0,0,0,0,0]  # Kick Drum
-    ]
-     
+    # One mixer voice per track, each hit restarts its rendered sample
+    shots = (
+        oneshot.OneShot(mixer.voice[0], snare, samp_rate, render_cache, tap, 0),
+        oneshot.OneShot(mixer.voice[1], hh, samp_rate, render_cache, tap, 1),
+        oneshot.OneShot(mixer.voice[2], kick, samp_rate, render_cache, tap, 2),
+    )
+else:
+    # The scope needs the rendered one-shots, there is nothing to tap here
+    scope_enabled = False
 
-inst_count = len(seq)
-seq_count = len(seq[inst_count-1])
+    # One synth, one render loop, one mixer voice. The pool shares its 12
+    # note channels out: kick over snare over hats when they run short.
+    pool = voicepool.VoicePool(synth, (snare, hh, kick), priorities=(1, 0, 2))
+    mixer.voice[0].play(synth)
 
-seq_len = seq_count
-num_sounds = inst_count
 
 
-# UI Definition
+if oneshot_mode:
+    # Each shot scales its voice's level by the velocity of its last hit
+    for shot in shots:
+        shot.set_volume(mix_vol)
+else:
+    # Levels per drum are pool.set_level(), through the Notes' amplitude
+    mixer.voice[0].level = mix_vol
 
-# layout = GridLayout(
-#     x=0,
-#     y=0,
-#     width=220,
-#     height=105,
-#     grid_size=(seq_count, inst_count),
-#     cell_padding=10,
-# )
-
-
-def updateUI():
-    layout = GridLayout(
-        x=0,
-        y=0,
-        width=220,
-        height=105,
-        grid_size=(seq_count, inst_count),
-        cell_padding=10,
-    )
-    for x in range(seq_count):
-        for y in range(inst_count):
-    #         _labels.append(label.Label(terminalio.FONT, scale=2, x=0, y=0, text=str(seq[x][y])))
-            
-            layout.add_content(
-                display_beat(seq[y][x]),
-    #             label.Label(terminalio.FONT, scale=2, x=0, y=0, text=str(seq[y][x])),
-                grid_position=(x, y),
-                cell_size=(1, 1))
-    return layout                
 
+bpm = 240	
+# Sequencer steps per beat: 1 for quarter notes, 4 for 16ths
+steps_per_beat = 1
+delVal = 60/bpm
 
+# Step clock, runs from absolute deadlines so the tempo does not drift
+if alloc_free:
+    clock = scheduler.TickScheduler(bpm, steps_per_beat, policy=scheduler.DROP)
+else:
+    clock = scheduler.StepScheduler(bpm, steps_per_beat, policy=scheduler.DROP)
 
+# Wake at least this often between steps, so keys are read and drawn
+# within 20 ms whatever the tempo, not on the next step
+key_poll_ns = 20_000_000
+clock.max_sleep_ns = key_poll_ns
 
+# Longest a playhead move may take to reach the screen: a tenth of a
+# 16th note at 300 BPM (50 ms)
+playhead_budget_ns = 5_000_000
 
-# Create array to hold labels requiring display
-_labels = []
+# Tracks: 0 Snare, 1 Hi Hat, 2 Kick Drum
+inst_count = 3
+seq_count = 8
 
+# One bitmask per track, plus a per-step mask of the tracks that hit
+seq = pattern.Pattern(inst_count, seq_count)
 
+seq_len = seq_count
+num_sounds = inst_count
 
-def display_beat(beat_value):
-    if beat_value ==1:
-        return Circle(0,0,10,fill=0xFF0000)
-    else:
-        return Circle(0,0,10,outline=0xFF0000)
+if alloc_free:
+    # Turns automatic collection off; collects once a bar instead
+    collector = scheduler.Collector(seq_len)
 
+# Native calls that outlast an audio buffer
+stalls = latency.StallMonitor(audio_profile, log=dPrint if debug_enabled else None)
+refresher.stalls = stalls
+if alloc_free:
+    collector.stalls = stalls
 
 
-# for x in range(seq_count):
-#     for y in range(inst_count):
-# #         _labels.append(label.Label(terminalio.FONT, scale=2, x=0, y=0, text=str(seq[x][y])))
-#         
-#         layout.add_content(
-#             display_beat(seq[y][x]),
-# #             label.Label(terminalio.FONT, scale=2, x=0, y=0, text=str(seq[y][x])),
-#             grid_position=(x, y),
-#             cell_size=(1, 1))
-                
+# UI Definition
 
+# One TileGrid for the whole pattern, a toggle only rewrites one tile
+grid = stepgrid.StepGrid(inst_count, seq_count, x=0, y=0, width=220, height=105)
+grid.load(seq)
 
 
+def updateUI(track, step):
+    grid.set_cell(track, step, seq.get(track, step))
+    refresher.mark(refresh.GRID)
 
 
 
-async def playSnare(v):   
-    snare.play()
 
-    
-async def playKick(v):   
-    kick.play()
 
-    
-async def playHat(v):
-    hh.play()
 
+# Voice table, index matches the track number in seq. Each takes an
+# optional amplitude, for live MIDI hits. They are built once here so a
+# step does not allocate anything.
+if oneshot_mode:
+    voices = (shots[0].play, shots[1].play, shots[2].play)
+else:
+    voices = (
+        lambda amplitude=1.0: pool.play(0, amplitude),
+        lambda amplitude=1.0: pool.play(1, amplitude),
+        lambda amplitude=1.0: pool.play(2, amplitude),
+    )
+live_voices = voices
 
-scount = 0
-snareTask = 0
-hhTask= 0
-kickTask = 0
 
 def adjust_volume(vol_inc):
     global mix_vol
@@ -221,100 +259,219 @@ def adjust_volume(vol_inc):
     elif mix_vol <= 0:
         mix_vol = 0
 #     vol = Nvol
-    mixer.voice[0].level = mix_vol
-    mixer.voice[1].level = mix_vol
-    mixer.voice[2].level = mix_vol
-
-
-async def handle_kbInput():
-    kbIn = ""
-    if supervisor.runtime.serial_bytes_available:
-        kbIn = sys.stdin.read(1)
-#             print(seq[input_map[kbIn]])
-#             print(str(input_map[kbIn]))
-        letr = str(kbIn)
-#             print(kbIn)
-#         dPrint(str(kbIn))
-        if letr in input_map:
-            map_val = input_map[letr]
-#                 beat = seq[map_val[0]][map_val[1]]
-#             dPrint(seq[map_val[0]][map_val[1]])
-            seq[map_val[0]][map_val[1]] = 1 - seq[map_val[0]][map_val[1]]
-#             dPrint(seq[map_val[0]][map_val[1]])
-            main_group.append(updateUI())
-            main_group.remove(main_group[0])
-#                 print(map_val[0])
-#             dPrint(seq[map_val[0]][map_val[1]])
-        else:
-            if kbIn == ";":
-                adjust_volume(0.05)
-            elif kbIn == ".":
-                adjust_volume(-0.05)
-#                     mix_vol -= .05
-#                     dPrint(mix_vol)    
+    if oneshot_mode:
+        for shot in shots:
+            shot.set_volume(mix_vol)
+    else:
+        mixer.voice[0].level = mix_vol
+
+
+def transport_start():
+    global playing, sCount
+    sCount = 0
+    playing = True
+    if midi_clock == "master":
+        master.start()
+
+
+def transport_stop():
+    global playing
+    playing = False
+    if midi_clock == "master":
+        master.stop()
+
+
+def transport_continue():
+    global playing
+    playing = True
+
+
+if midi_clock != "internal" or midi_notes:
+    import usb_midi
+    import midi
+
+if midi_clock == "follow":
+    # Wake every 2 ms at most, so a deadline the follower moves earlier
+    # is not slept through
+    clock.max_sleep_ns = 2_000_000
+    follower = midi.ClockFollower(usb_midi.ports[0], clock, on_start=transport_start,
+                                  on_stop=transport_stop, on_continue=transport_continue)
+elif midi_clock == "master":
+    master = midi.ClockMaster(usb_midi.ports[1], clock)
+
+if midi_notes:
+    # General MIDI drum notes to tracks: 0 snare, 1 hi hat, 2 kick
+    note_map = midi.note_map({35: 2, 36: 2, 37: 0, 38: 0, 40: 0, 42: 1, 44: 1, 46: 1})
+    # One reader owns the port; clock bytes go on to the follower
+    notes_in = midi.NoteInput(usb_midi.ports[0], live_voices, note_map,
+                              realtime=follower.handle if midi_clock == "follow" else None)
+
+
+# Toggle parity per cell for the current tick. Pressing the same cell twice
+# before it is applied cancels out, and each changed cell is redrawn once.
+pending = bytearray(inst_count * seq_count)
+
+
+def handle_kbInput():
+    n = supervisor.runtime.serial_bytes_available
+    if not n:
+        return
+
+    # Take everything that queued up since the last tick in one read
+    kbIn = sys.stdin.read(n)
+    toggled = False
+    vol_steps = 0
+    for letr in kbIn:
+        map_val = input_map.get(letr)
+        if map_val is not None:
+            pending[map_val[0] * seq_count + map_val[1]] ^= 1
+            toggled = True
+        elif letr == ";":
+            vol_steps += 1
+        elif letr == ".":
+            vol_steps -= 1
+        elif letr == "/" and oneshot_mode:
+            print(render_cache.stats())
+        elif letr == "=" and profiling_enabled:
+            prof.dump()
+        elif letr == " " and midi_clock != "follow":
+            if playing:
+                transport_stop()
+            else:
+                transport_start()
+#         else:
 #             dPrint("Unbound Key")
 
+    if toggled:
+        for i in range(len(pending)):
+            if pending[i]:
+                pending[i] = 0
+                track = i // seq_count
+                step = i % seq_count
+                seq.toggle(track, step)
+                updateUI(track, step)
+
+    if vol_steps:
+        adjust_volume(0.05 * vol_steps)
+
+
+def seq_Step():
+    #####
+    # Handle Sounds
+    #####
+    hits = seq.column(sCount)
+    i = 0
+    while hits:
+        if hits & 1:
+            voices[i]()
+        hits >>= 1
+        i += 1
+
+
+if profiling_enabled:
+    # Rebind the hot path names to timed wrappers. Callers look them up
+    # as globals at call time, so this is all it takes.
+    import profiler
+    prof = profiler.Profiler(clock)
+    handle_kbInput = prof.wrap("keys", handle_kbInput)
+    seq_Step = prof.wrap("step", seq_Step)
+    updateUI = prof.wrap("ui", updateUI, 2)
+    refresher.update = prof.wrap("refresh", refresher.update, 1)
+    voices = (prof.wrap("snare", voices[0]), prof.wrap("hat", voices[1]), prof.wrap("kick", voices[2]))
+
+
+main_group.append(grid)
+main_group.append(grid.playhead)
+
+if scope_enabled:
+    scope_view = scope.ScopeView(tap, x=0, y=107, width=180, height=28)
+    meters = scope.LevelMeters(3, x=186, y=107, width=54, height=28)
+    main_group.append(scope_view)
+    main_group.append(meters)
+    monitor = scope.ScopeMonitor(tap, scope_view, meters, fps=15)
+    monitor.stalls = stalls
+
+
+def scope_frame():
+    refresher.mark(refresh.SCOPE | refresh.METERS)
+    refresher.update(clock.time_left())
+
 
-# def seq_Step():
-async def seq_Step():
-    global sCount
-#     print(global mix_vol)
-#     sCount = 0
-#     while True:
-        
-        #####
-        # Handle Sounds
-        #####
-    
-    if sCount < 8:
-#             print("Start if loop")
-#             print(sCount) 
-#             m = ""
-#         msg = ""
-        for i in range(num_sounds):
-#                 print(str(i) + " | " + str(sCount) + " | " + str(seq[i][sCount]))
-#                 m += str(seq[i][sCount]) 
-            if seq[i][sCount]:
-                
-                if i == 0:
-                    snareTask = asyncio.create_task(playSnare(seq[i][sCount]))
-#                         print("Triggering Snare")
-                if i==1:
-                    hhTask = asyncio.create_task(playHat(seq[i][sCount]))
-                    
-                if i==2:
-    #                 kick.play()
-                    kickTask = asyncio.create_task(playKick(seq[i][sCount]))                
-#             print("End if loop")
-#         await asyncio.gather()
-                
-                    
-
-        
-
-main_group.append(updateUI())
 async def main():
 # while True:
     global sCount
     sCount = 0
-    
+
+    refresher.mark(refresh.GRID)
+    clock.start()
+    # Only one task may read the input port: with midi_notes on, notes_in
+    # reads it and hands clock bytes on to the follower
+    if midi_notes:
+        asyncio.create_task(notes_in.run())
+    elif midi_clock == "follow":
+        asyncio.create_task(follower.run())
+    if midi_clock == "master":
+        master.start()
+        asyncio.create_task(master.run())
+    if scope_enabled:
+        # Its own task, so it draws at its frame rate and not once a step
+        asyncio.create_task(monitor.run(clock.time_left, scope_frame))
     while True:
-        await handle_kbInput()    
-        await seq_Step()
-        asyncio.gather()
-        
-        sCount += 1
+        #####
+        # Wait for the next step deadline
+        #####
+        if alloc_free:
+            # sleep_ms() hands back a shared generator, where awaiting
+            # clock.wait() would create a coroutine every step
+            await asyncio.sleep_ms(clock.sleep_ms())
+            due = clock.advance()
+        else:
+            due = await clock.wait()
+        if alloc_free:
+            # Counted from here until going back to sleep
+            collector.begin()
+
+        if playing and due:
+            # Steps dropped while we were late still move the playhead
+            sCount = (sCount + clock.skipped) % seq_len
+            for _ in range(due):
+                seq_Step()
+                grid.set_playhead(sCount)
+                sCount = (sCount + 1) % seq_len
+            refresher.mark(refresh.PLAYHEAD)
 
-        
         #####
         # Handle Input
         #####
-        
-
-
-        await asyncio.sleep(delVal)
-        if sCount > 7:# sCount <8:
-            sCount =0
+        # All but key handling counts toward the allocation counter
+        if alloc_free:
+            collector.pause()
+        handle_kbInput()
+        if alloc_free:
+            collector.begin()
+
+        refresher.update(clock.time_left())
+
+        if not oneshot_mode:
+            # Free the channels of drums that have died away
+            pool.update()
+
+        if alloc_free:
+            # The step just played may be the one picked for gc
+            collector.end((sCount - 1) % seq_len if due else -1, clock.time_left())
+
+        if debug_enabled and due and clock.count % 64 == 0:
+            dPrint("steps, mean/max late us, skipped: " + str(clock.stats()))
+            # Frames with only the playhead dirty: what a move alone costs
+            if refresher.worst_alone(refresh.PLAYHEAD) > playhead_budget_ns:
+                dPrint("playhead refresh over budget: " + str(refresher.worst_alone(refresh.PLAYHEAD) // 1000) + " us")
+            if alloc_free:
+                dPrint(collector.stats())
+            dPrint(stalls.stats())
+            if not oneshot_mode:
+                dPrint(pool.stats())
+            if midi_clock == "follow":
+                dPrint("midi clock: " + str(follower.bpm) + " bpm, " + str(follower.relocks) + " relocks")
 
 
 # Run Main Loop
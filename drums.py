@@ -1,5 +1,6 @@
 import ulab.numpy as np
 import random
+import struct
 import synthio
 
 SAMPLE_SIZE = 200
@@ -7,9 +8,63 @@ sinwave1 = np.array(np.sin(np.linspace(0, 2*np.pi, SAMPLE_SIZE, endpoint=False))
 sinwave2 = np.array(np.sin(np.linspace(np.pi/2, 2.5*np.pi, SAMPLE_SIZE, endpoint=False)) * 32767, dtype=np.int16)
 downwave = np.linspace(32767, -32767, num=3, dtype=np.int16)
 
-noisewave = np.array([random.randint(-32767, 32767) for i in range(SAMPLE_SIZE)], dtype=np.int16)
-w1 = np.array( [int(max(min(sinwave1[i] + (noisewave[i]/2.0), 32767), -32767)) for i in range(SAMPLE_SIZE)], dtype=np.int16)
-w2 = np.array( [int(max(min(sinwave2[i] + (noisewave[i]/2.0), 32767), -32767)) for i in range(SAMPLE_SIZE)], dtype=np.int16)
+# Noise based tables are built once from a fixed seed and kept in flash,
+# so boots only read them back. Code cannot write to CIRCUITPY unless
+# boot.py remounts it, so drum_tables.bin ships with the project; it is
+# built on the host with
+#   python -c "import hostsim; hostsim.install(); import drums"
+# and rebuilt there whenever SAMPLE_SIZE or NOISE_SEED change.
+NOISE_SEED = 1234
+TABLE_FILE = "drum_tables.bin"  # Relative to the CIRCUITPY root
+_TABLE_HEADER = struct.pack("<4sHH", b"DRT1", SAMPLE_SIZE, NOISE_SEED)
+
+def _make_noise():
+    try:
+        gen = np.random.Generator(NOISE_SEED)
+        noise = gen.uniform(-32767, 32767, SAMPLE_SIZE)
+    except AttributeError:
+        # ulab built without its random module
+        random.seed(NOISE_SEED)
+        noise = [random.randint(-32767, 32767) for i in range(SAMPLE_SIZE)]
+    return np.array(noise, dtype=np.int16)
+
+def _add_noise(wave, noise):
+    return np.array(np.clip(wave + noise * 0.5, -32767, 32767), dtype=np.int16)
+
+def _load_tables():
+    try:
+        with open(TABLE_FILE, "rb") as f:
+            if f.read(len(_TABLE_HEADER)) != _TABLE_HEADER:
+                return None
+            tables = []
+            for _ in range(3):
+                t = np.zeros(SAMPLE_SIZE, dtype=np.int16)
+                if f.readinto(t) != SAMPLE_SIZE * 2:
+                    return None
+                tables.append(t)
+            return tables
+    except OSError:
+        return None
+
+def _save_tables(tables):
+    try:
+        with open(TABLE_FILE, "wb") as f:
+            f.write(_TABLE_HEADER)
+            for t in tables:
+                f.write(t)
+    except OSError:
+        # CIRCUITPY is read-only to code unless boot.py remounted it; the
+        # tables are then rebuilt on each boot
+        pass
+
+_tables = _load_tables()
+if _tables is None:
+    noisewave = _make_noise()
+    w1 = _add_noise(sinwave1, noisewave)
+    w2 = _add_noise(sinwave2, noisewave)
+    _save_tables((noisewave, w1, w2))
+else:
+    noisewave, w1, w2 = _tables
 
 class KickDrum:
     def __init__(self, synth):
@@ -22,6 +77,7 @@ class KickDrum:
         self.lfo.rate=20
         
         self.filter_fr = 2000
+        self.filter_mode = "lpf"
         self.lpf = self.synth.low_pass_filter(frequency=self.filter_fr)
 
         self.amp_env1 = synthio.Envelope(attack_time=0.0, decay_time=0.075, release_time=0, attack_level=1, sustain_level=0)
@@ -32,6 +88,9 @@ class KickDrum:
 
         self.amp_env3 = synthio.Envelope(attack_time=0.0, decay_time=0.095, release_time=0, attack_level=1, sustain_level=0)
         self.note3 = synthio.Note(frequency=41, envelope=self.amp_env3, waveform=sinwave2, filter=self.lpf, bend=self.lfo)
+        # Built once, so press() does not allocate a tuple per hit
+        self.chord = (self.note1, self.note2, self.note3)
+        self.amplitude = 1.0
     
     def setLPF(self, fr):
         self.filter_fr = fr
@@ -40,11 +99,24 @@ class KickDrum:
         self.note2.filter = self.lpf
         self.note3.filter = self.lpf
     
-    def play(self, synth=None):
+    def setAmplitude(self, amplitude):
+        # Set in place (amplitude is usually one of midi.VELOCITY's floats),
+        # so a hit at a new velocity does not allocate
+        self.amplitude = amplitude
+        self.note1.amplitude = amplitude
+        self.note2.amplitude = amplitude
+        self.note3.amplitude = amplitude
+
+    def notes(self):
+        return self.chord
+
+    def play(self, synth=None, amplitude=1.0):
         if synth is None:
             synth = self.synth
+        if amplitude != self.amplitude:
+            self.setAmplitude(amplitude)
         self.lfo.retrigger()
-        synth.press((self.note1, self.note2, self.note3))
+        synth.press(self.chord)
 
 class Snare:
     def __init__(self, synth):
@@ -57,6 +129,7 @@ class Snare:
         self.lfo.rate=20
 
         self.filter_fr = 9500
+        self.filter_mode = "lpf"
         self.lpf = self.synth.low_pass_filter(self.filter_fr)
 
         self.amp_env1 = synthio.Envelope(attack_time=0.0, decay_time=0.115, release_time=0, attack_level=1, sustain_level=0)
@@ -67,6 +140,8 @@ class Snare:
 
         self.amp_env3 = synthio.Envelope(attack_time=0.0, decay_time=0.115, release_time=0, attack_level=1, sustain_level=0)
         self.note3 = synthio.Note(frequency=165, envelope=self.amp_env3, waveform=w2, filter=self.lpf, bend=self.lfo)
+        self.chord = (self.note1, self.note2, self.note3)
+        self.amplitude = 1.0
 
     def setLPF(self, fr):
         self.filter_fr = fr
@@ -75,11 +150,22 @@ class Snare:
         self.note2.filter = self.lpf
         self.note3.filter = self.lpf
 
-    def play(self, synth=None):
+    def setAmplitude(self, amplitude):
+        self.amplitude = amplitude
+        self.note1.amplitude = amplitude
+        self.note2.amplitude = amplitude
+        self.note3.amplitude = amplitude
+
+    def notes(self):
+        return self.chord
+
+    def play(self, synth=None, amplitude=1.0):
         if synth is None:
             synth = self.synth
+        if amplitude != self.amplitude:
+            self.setAmplitude(amplitude)
         self.lfo.retrigger()
-        synth.press((self.note1, self.note2, self.note3))
+        synth.press(self.chord)
         
 class HighHat:
     def __init__(self, synth, t=0.115):
@@ -94,6 +180,7 @@ class HighHat:
         self.t = t
 
         self.filter_fr = 9500
+        self.filter_mode = "hpf"
         self.hpf = self.synth.high_pass_filter(self.filter_fr)
 
         self.amp_env1 = synthio.Envelope(attack_time=0.0, decay_time=t, release_time=0, attack_level=1, sustain_level=0)
@@ -104,6 +191,8 @@ class HighHat:
 
         self.amp_env3 = synthio.Envelope(attack_time=0.0, decay_time=t, release_time=0, attack_level=1, sustain_level=0)
         self.note3 = synthio.Note(frequency=165, envelope=self.amp_env3, waveform=noisewave, filter=self.hpf, bend=self.lfo)
+        self.chord = (self.note1, self.note2, self.note3)
+        self.amplitude = 1.0
 
     def setHPF(self, fr):
         self.filter_fr = fr
@@ -123,10 +212,23 @@ class HighHat:
 
         self.amp_env3 = synthio.Envelope(attack_time=0.0, decay_time=t, release_time=0, attack_level=1, sustain_level=0)
         self.note3 = synthio.Note(frequency=165, envelope=self.amp_env3, waveform=noisewave, filter=self.hpf, bend=self.lfo)
+        self.chord = (self.note1, self.note2, self.note3)
+        self.amplitude = 1.0
         
-    def play(self, synth=None):
+    def setAmplitude(self, amplitude):
+        self.amplitude = amplitude
+        self.note1.amplitude = amplitude
+        self.note2.amplitude = amplitude
+        self.note3.amplitude = amplitude
+
+    def notes(self):
+        return self.chord
+
+    def play(self, synth=None, amplitude=1.0):
         if synth is None:
             synth = self.synth
+        if amplitude != self.amplitude:
+            self.setAmplitude(amplitude)
         self.lfo.retrigger()
-        synth.press((self.note1, self.note2, self.note3))
+        synth.press(self.chord)
         
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""Headless host simulator.
+
+Runs code.py (or any script of this project) unmodified on CPython, with
+stand-ins for the CircuitPython modules it imports:
+
+    board, displayio, bitmaptools, terminalio, supervisor, synthio,
+    audiocore, audiomixer, audiobusio, usb_hid, usb_midi, ulab.numpy,
+    ulab.scipy.signal
+
+The stand-ins need NumPy on the host; nothing here is copied to the board.
+Audio is pulled from whatever audiobusio.I2SOut plays, in real time, and
+can be written to a WAV file. Display refreshes can be saved as PNG
+frames, and keystrokes are scripted as (seconds, text) pairs.
+
+    python -m hostsim --seconds 4 --keys "0.5:ez,1.0:s" --wav out.wav --frames frames/
+"""
+
+import asyncio
+import gc
+import os
+import re
+import shutil
+import sys
+import time
+import tempfile
+import threading
+import tracemalloc
+import wave
+import _thread
+
+from . import _host
+from .keys import Keyboard, parse
+from .png import write_png
+
+# Heap size reported by the gc.mem_free() stand-in
+HEAP_SIZE = 192 * 1024
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules")
+
+
+def install():
+    """Put the stand-ins ahead of everything else on sys.path, and the
+    project root and lib/ after them, as on CIRCUITPY. Also gives gc and
+    asyncio the mem_alloc()/mem_free() and sleep_ms() CircuitPython has."""
+    if MODULES not in sys.path:
+        sys.path.insert(0, MODULES)
+    for path in (ROOT, os.path.join(ROOT, "lib")):
+        if path not in sys.path:
+            sys.path.append(path)
+    if not hasattr(gc, "mem_free"):
+        gc.mem_alloc = _mem_alloc
+        gc.mem_free = _mem_free
+    if not hasattr(asyncio, "sleep_ms"):
+        asyncio.sleep_ms = _sleep_ms
+
+
+def _sleep_ms(ms):
+    return asyncio.sleep(ms / 1000)
+
+
+# CPython has no gc.mem_alloc()/mem_free(). While tracemalloc is tracing,
+# they report the traced bytes against HEAP_SIZE; otherwise nothing moves.
+def _mem_alloc():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def _mem_free():
+    return HEAP_SIZE - _mem_alloc()
+
+
+def apply_settings(source, settings):
+    """source with the first top level "name = ..." line of each setting
+    replaced by name = repr(value)."""
+    for name, value in settings.items():
+        source, count = re.subn(r"^{} = .*$".format(re.escape(name)),
+                                "{} = {!r}".format(name, value), source, count=1, flags=re.M)
+        if not count:
+            raise ValueError("no top level assignment to " + name)
+    return source
+
+
+class _AudioRecorder(threading.Thread):
+    """Pulls blocks from the I2S output at the sample rate, like the DMA
+    would, and writes them to a WAV file. A source with a buffer_size
+    (audiomixer.Mixer) is pulled a buffer at a time at its own rate, so
+    underruns reflect its buffering."""
+
+    def __init__(self, path, sample_rate, block=256):
+        super().__init__(daemon=True)
+        self.path = path
+        self.sample_rate = sample_rate
+        self.block = block
+        self.running = True
+        self.blocks = []
+        self.underruns = 0  # Blocks rendered late
+
+    def run(self):
+        deadline = time.monotonic()
+        while self.running:
+            source = _host.audio_output
+            block = self.block
+            if source is not None:
+                self.channels = getattr(source, "channel_count", 1)
+                self.sample_rate = getattr(source, "sample_rate", self.sample_rate)
+                if getattr(source, "buffer_size", None):
+                    block = source.buffer_size // (2 * self.channels)
+                self.blocks.append(source.read(block))
+            deadline += block / self.sample_rate
+            wait = deadline - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                self.underruns += 1
+
+    def close(self):
+        self.running = False
+        self.join()
+        if self.path is None:
+            return
+        with wave.open(self.path, "wb") as out:
+            out.setnchannels(getattr(self, "channels", 1))
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            for data in self.blocks:
+                out.writeframes(data.astype("<i2").tobytes())
+
+
+class _FrameRecorder:
+    """Saves the display as numbered PNGs on refresh, at most fps a second."""
+
+    def __init__(self, directory, fps):
+        self.directory = directory
+        self.min_interval = 1.0 / fps
+        self.last = -1.0
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, display, force=False):
+        now = _host.elapsed()
+        if not force and now - self.last < self.min_interval:
+            return
+        self.last = now
+        write_png(os.path.join(self.directory, "frame_{:05d}.png".format(self.count)), display.render())
+        self.count += 1
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def run(script="code.py", seconds=None, keys=(), wav=None, frames=None, fps=10,
+        sample_rate=24000, cwd=None, settings=None, events=None):
+    """Run script (relative to the project root) until it ends or seconds
+    pass. keys is a list of (seconds, text) or a "0.5:e,1.0:r" string.
+    settings replaces top level assignments in the script, such as
+    {"oneshot_mode": True}, before it runs. events, if a list, collects
+    the stand-ins' timing events (see _host.events).
+    Returns a dict with the keyboard log, frame count, audio underruns and
+    the script's globals, so callers can inspect its state afterwards."""
+    install()
+    _host.reset()
+    if isinstance(keys, str):
+        keys = parse(keys)
+    keyboard = Keyboard(keys)
+    _host.keyboard = keyboard
+    _host.events = events
+
+    frame_recorder = None
+    if frames is not None:
+        frame_recorder = _FrameRecorder(frames, fps)
+        _host.frame_sink = frame_recorder
+    audio = _AudioRecorder(wav, sample_rate)
+    audio.start()
+
+    # With auto_refresh on nothing calls refresh(), so sample the screen
+    stop = threading.Event()
+
+    def auto_frames():
+        import board  # pylint: disable=import-outside-toplevel
+        while not stop.wait(1.0 / fps):
+            if board.DISPLAY.auto_refresh and frame_recorder is not None:
+                frame_recorder(board.DISPLAY, force=True)
+
+    sampler = threading.Thread(target=auto_frames, daemon=True)
+    sampler.start()
+
+    timer = None
+    if seconds is not None:
+        timer = threading.Timer(seconds, _thread.interrupt_main)
+        timer.start()
+
+    script_path = os.path.join(ROOT, script)
+    old_cwd = os.getcwd()
+    old_stdin = sys.stdin
+    workdir = tempfile.mkdtemp(prefix="hostsim-") if cwd is None else None
+    os.chdir(cwd if workdir is None else workdir)
+    sys.stdin = keyboard
+    namespace = {"__name__": "__main__", "__file__": script_path}
+    try:
+        with open(script_path) as f:
+            source = apply_settings(f.read(), settings or {})
+        exec(compile(source, script_path, "exec"), namespace)  # pylint: disable=exec-used
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdin = old_stdin
+        os.chdir(old_cwd)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if timer is not None:
+            timer.cancel()
+        stop.set()
+        sampler.join()
+        audio.close()
+        _host.frame_sink = None
+
+    return {
+        "keys": keyboard.log,
+        "frames": 0 if frame_recorder is None else frame_recorder.count,
+        "underruns": audio.underruns,
+        "globals": namespace,
+    }
@@ -0,0 +1,26 @@
+"""python -m hostsim [--seconds S] [--keys SCRIPT] [--wav FILE] [--frames DIR]"""
+
+import argparse
+
+from . import run
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m hostsim", description="Run code.py on the host")
+    parser.add_argument("--script", default="code.py", help="script to run, relative to the project root")
+    parser.add_argument("--seconds", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--keys", default="", help='scripted keys, e.g. "0.5:ez,1.0:s" (\\, for a comma)')
+    parser.add_argument("--wav", default=None, help="write the audio output to this WAV file")
+    parser.add_argument("--frames", default=None, help="save display frames as PNGs in this directory")
+    parser.add_argument("--fps", type=float, default=10, help="most frames saved per second")
+    parser.add_argument("--sample-rate", type=int, default=24000, help="rate the audio output is pulled at")
+    args = parser.parse_args()
+
+    result = run(args.script, seconds=args.seconds, keys=args.keys, wav=args.wav,
+                 frames=args.frames, fps=args.fps, sample_rate=args.sample_rate)
+    print("hostsim: {} frames, {} audio underruns, keys {}".format(
+        result["frames"], result["underruns"], result["keys"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Shared state between the stand-in modules and the runner.
+
+The stand-ins (board, displayio, supervisor, ...) are imported by the code
+under test, so anything the runner needs to feed in (keystrokes) or take
+out (audio, display frames) goes through this module.
+"""
+
+import time
+
+start_ns = time.monotonic_ns()
+
+# Scripted keyboard, see hostsim.keys.Keyboard
+keyboard = None
+
+# Called with the display after each refresh, when frames are recorded
+frame_sink = None
+
+# The sample an audiobusio.I2SOut is currently playing
+audio_output = None
+
+# When a list, stand-ins append (event, time.monotonic_ns()) to it:
+# "midi_in" as bytes are injected into usb_midi, "press" as a synth note
+# is pressed or a mixer voice starts, "sound" as that first reaches the
+# audio output. Used to measure MIDI to sound latency.
+events = None
+
+
+def log(event):
+    if events is not None:
+        events.append((event, time.monotonic_ns()))
+
+
+def reset():
+    global start_ns, keyboard, frame_sink, audio_output, events  # pylint: disable=global-statement
+    start_ns = time.monotonic_ns()
+    keyboard = None
+    frame_sink = None
+    audio_output = None
+    events = None
+
+
+def elapsed():
+    """Seconds since the simulated board started."""
+    return (time.monotonic_ns() - start_ns) / 1e9
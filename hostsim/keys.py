@@ -0,0 +1,55 @@
+"""Scripted keystrokes standing in for the serial console."""
+
+from . import _host
+
+
+def parse(script):
+    """Parse "0.5:e,1.0:rt" style scripts into [(seconds, text), ...].
+    A comma in the text is written as \\, (the ',' key is bound in code.py)."""
+    events = []
+    for item in script.replace("\\,", "\0").split(","):
+        if not item:
+            continue
+        at, text = item.split(":", 1)
+        events.append((float(at), text.replace("\0", ",")))
+    return events
+
+
+class Keyboard:
+    """Releases each scripted text into the input buffer once its time
+    (seconds since the board started) has passed. Installed as sys.stdin
+    and read through supervisor.runtime.serial_bytes_available."""
+
+    def __init__(self, events=()):
+        self._events = sorted(events)
+        self._buffer = ""
+        self.log = []  # (seconds, text) as each event was released
+
+    def type(self, text, at=None):
+        """Queue text at a time, or right away."""
+        if at is None:
+            at = _host.elapsed()
+        self._events.append((at, text))
+        self._events.sort()
+
+    def _release(self):
+        now = _host.elapsed()
+        while self._events and self._events[0][0] <= now:
+            at, text = self._events.pop(0)
+            self._buffer += text
+            self.log.append((at, text))
+
+    @property
+    def available(self):
+        self._release()
+        return len(self._buffer)
+
+    def read(self, n=-1):
+        self._release()
+        if n < 0:
+            n = len(self._buffer)
+        text, self._buffer = self._buffer[:n], self._buffer[n:]
+        return text
+
+    def readline(self):
+        return self.read()
@@ -0,0 +1,62 @@
+"""audiocore stand-in."""
+
+import numpy as np
+
+from hostsim import _host
+
+
+def _to_int16(buffer):
+    data = np.asarray(buffer)
+    if data.dtype == np.uint8:
+        return ((data.astype(np.int32) - 128) * 256).astype(np.int16)
+    if data.dtype == np.int8:
+        return data.astype(np.int16) * 256
+    if data.dtype == np.uint16:
+        return (data.astype(np.int32) - 32768).astype(np.int16)
+    return data.astype(np.int16)
+
+
+class RawSample:
+    def __init__(self, buffer, *, channel_count=1, sample_rate=8000, single_buffer=True):
+        self.buffer = buffer
+        self.channel_count = channel_count
+        self.sample_rate = sample_rate
+        self.single_buffer = single_buffer
+
+    def _host_open(self, loop=False):
+        return _RawReader(_to_int16(self.buffer), loop)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
+
+
+class _RawReader:  # pylint: disable=too-few-public-methods
+    def __init__(self, data, loop):
+        self.data = data
+        self.loop = loop
+        self.pos = 0
+        self.fresh = True
+
+    def read(self, n):
+        """Up to n samples, or None once the sample has finished."""
+        if self.fresh:
+            self.fresh = False
+            _host.log("sound")
+        data = self.data
+        if self.pos >= len(data):
+            if not self.loop or not len(data):
+                return None
+            self.pos = 0
+        if self.loop:
+            idx = (self.pos + np.arange(n)) % len(data)
+            self.pos = (self.pos + n) % len(data)
+            return data[idx]
+        out = data[self.pos:self.pos + n]
+        self.pos += n
+        return out
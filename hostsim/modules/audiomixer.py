@@ -0,0 +1,76 @@
+"""audiomixer stand-in."""
+
+import threading
+
+import numpy as np
+
+from hostsim import _host
+
+
+class MixerVoice:
+    def __init__(self, lock):
+        self.level = 1.0
+        self.loop = False
+        self._reader = None
+        self._lock = lock
+
+    def play(self, sample, *, loop=False):
+        _host.log("press")
+        with self._lock:
+            self.loop = loop
+            self._reader = sample._host_open(loop)  # pylint: disable=protected-access
+
+    def stop(self):
+        with self._lock:
+            self._reader = None
+
+    @property
+    def playing(self):
+        return self._reader is not None
+
+
+class Mixer:
+    # pylint: disable=too-many-arguments
+    def __init__(self, *, voice_count=2, buffer_size=1024, channel_count=2,
+                 bits_per_sample=16, samples_signed=True, sample_rate=8000):
+        self.buffer_size = buffer_size
+        self.channel_count = channel_count
+        self.bits_per_sample = bits_per_sample
+        self.samples_signed = samples_signed
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.voice = tuple(MixerVoice(self._lock) for _ in range(voice_count))
+
+    @property
+    def playing(self):
+        return any(v.playing for v in self.voice)
+
+    def play(self, sample, *, voice=0, loop=False):
+        self.voice[voice].play(sample, loop=loop)
+
+    def stop_voice(self, voice=0):
+        self.voice[voice].stop()
+
+    def deinit(self):
+        for v in self.voice:
+            v.stop()
+
+    def _host_open(self, loop=False):  # pylint: disable=unused-argument
+        return self
+
+    def read(self, n):
+        """n samples of mixed output as int16."""
+        mix = np.zeros(n)
+        with self._lock:
+            readers = [(v, v._reader, v.level) for v in self.voice]  # pylint: disable=protected-access
+        for voice, reader, level in readers:
+            if reader is None:
+                continue
+            data = reader.read(n)
+            if data is None:
+                with self._lock:
+                    if voice._reader is reader:  # pylint: disable=protected-access
+                        voice._reader = None  # pylint: disable=protected-access
+                continue
+            mix[:len(data)] += data * level
+        return np.clip(mix, -32767, 32767).astype(np.int16)
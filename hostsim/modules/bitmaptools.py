@@ -0,0 +1,46 @@
+"""bitmaptools stand-in (the drawing calls used by this project)."""
+
+# pylint: disable=protected-access
+
+
+def fill_region(dest_bitmap, x1, y1, x2, y2, value):
+    x1, x2 = sorted((int(x1), int(x2)))
+    y1, y2 = sorted((int(y1), int(y2)))
+    dest_bitmap._pixels[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)] = value
+
+
+def draw_line(dest_bitmap, x1, y1, x2, y2, value):
+    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+    # Bresenham, clipped to the bitmap
+    dx = abs(x2 - x1)
+    dy = -abs(y2 - y1)
+    sx = 1 if x1 < x2 else -1
+    sy = 1 if y1 < y2 else -1
+    err = dx + dy
+    while True:
+        if 0 <= x1 < dest_bitmap.width and 0 <= y1 < dest_bitmap.height:
+            dest_bitmap._pixels[y1, x1] = value
+        if x1 == x2 and y1 == y2:
+            break
+        e2 = 2 * err
+        if e2 >= dy:
+            err += dy
+            x1 += sx
+        if e2 <= dx:
+            err += dx
+            y1 += sy
+
+
+def draw_polygon(dest_bitmap, xs, ys, value, close=True):
+    points = len(xs)
+    for i in range(points if close else points - 1):
+        j = (i + 1) % points
+        draw_line(dest_bitmap, xs[i], ys[i], xs[j], ys[j], value)
+
+
+def draw_circle(dest_bitmap, x, y, radius, value):
+    for px in range(-radius, radius + 1):
+        for py in range(-radius, radius + 1):
+            if radius * radius - radius <= px * px + py * py <= radius * radius + radius:
+                if 0 <= x + px < dest_bitmap.width and 0 <= y + py < dest_bitmap.height:
+                    dest_bitmap._pixels[y + py, x + px] = value
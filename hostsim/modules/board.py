@@ -0,0 +1,9 @@
+"""board stand-in for the M5Stack Cardputer."""
+
+import displayio
+
+DISPLAY = displayio.Display(240, 135)
+
+I2S_BIT_CLOCK = "GPIO41"
+I2S_WORD_SELECT = "GPIO43"
+I2S_DATA = "GPIO42"
@@ -0,0 +1,225 @@
+"""displayio stand-in: Bitmap, Palette, TileGrid, Group and a Display that
+composites its root group into an RGB array."""
+
+import numpy as np
+
+from hostsim import _host
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._pixels = np.zeros((height, width), dtype=np.uint32)
+
+    def _xy(self, index):
+        if isinstance(index, tuple):
+            return index
+        return index % self.width, index // self.width
+
+    def __getitem__(self, index):
+        x, y = self._xy(index)
+        return int(self._pixels[y, x])
+
+    def __setitem__(self, index, value):
+        x, y = self._xy(index)
+        self._pixels[y, x] = value
+
+    def fill(self, value):
+        self._pixels[:] = value
+
+    def blit(self, x, y, source_bitmap, *, x1=0, y1=0, x2=None, y2=None, skip_index=None):
+        x2 = source_bitmap.width if x2 is None else x2
+        y2 = source_bitmap.height if y2 is None else y2
+        region = source_bitmap._pixels[y1:y2, x1:x2]
+        target = self._pixels[y:y + region.shape[0], x:x + region.shape[1]]
+        region = region[:target.shape[0], :target.shape[1]]
+        if skip_index is None:
+            target[:] = region
+        else:
+            target[region != skip_index] = region[region != skip_index]
+
+
+class Palette:
+    def __init__(self, color_count, *, dither=False):
+        self._colors = [0] * color_count
+        self._transparent = [False] * color_count
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        if isinstance(color, (bytes, bytearray, tuple, list)):
+            color = (color[0] << 16) | (color[1] << 8) | color[2]
+        self._colors[index] = color
+
+    def make_transparent(self, index):
+        self._transparent[index] = True
+
+    def make_opaque(self, index):
+        self._transparent[index] = False
+
+    def is_transparent(self, index):
+        return self._transparent[index]
+
+    def _rgba(self):
+        """(colors, 3) uint8 table and a transparency mask."""
+        rgb = np.array([((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF) for c in self._colors], dtype=np.uint8)
+        return rgb, np.array(self._transparent, dtype=bool)
+
+
+class ColorConverter:
+    def convert(self, color):
+        return color
+
+
+class TileGrid:
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None,
+                 tile_height=None, default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self._columns = width
+        self._rows = height
+        self.tile_width = bitmap.width if tile_width is None else tile_width
+        self.tile_height = bitmap.height if tile_height is None else tile_height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+        self._tiles = np.full((height, width), default_tile, dtype=np.uint16)
+
+    # Subclasses (WaveViz) may shadow these with their own properties, so
+    # drawing only uses the private copies
+    @property
+    def width(self):
+        return self._columns
+
+    @property
+    def height(self):
+        return self._rows
+
+    def _xy(self, index):
+        if isinstance(index, tuple):
+            return index
+        return index % self._columns, index // self._columns
+
+    def __getitem__(self, index):
+        x, y = self._xy(index)
+        return int(self._tiles[y, x])
+
+    def __setitem__(self, index, tile):
+        x, y = self._xy(index)
+        self._tiles[y, x] = tile
+
+    def _draw(self, canvas, ox, oy, scale):
+        rgb, transparent = self.pixel_shader._rgba()
+        tiles_across = self.bitmap.width // self.tile_width
+        tw = self.tile_width
+        th = self.tile_height
+        for ty in range(self._rows):
+            for tx in range(self._columns):
+                tile = int(self._tiles[ty, tx])
+                sx = (tile % tiles_across) * tw
+                sy = (tile // tiles_across) * th
+                pixels = self.bitmap._pixels[sy:sy + th, sx:sx + tw]
+                if scale != 1:
+                    pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+                _paint(canvas, ox + (self.x + tx * tw) * scale, oy + (self.y + ty * th) * scale,
+                       rgb[pixels], ~transparent[pixels])
+
+
+def _paint(canvas, x, y, colors, mask):
+    """Copy colors into canvas at x, y where mask is set, clipped to the canvas."""
+    height, width = canvas.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1 = min(x + colors.shape[1], width)
+    y1 = min(y + colors.shape[0], height)
+    if x1 <= x0 or y1 <= y0:
+        return
+    colors = colors[y0 - y:y1 - y, x0 - x:x1 - x]
+    mask = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+    canvas[y0:y1, x0:x1][mask] = colors[mask]
+
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._layers = []
+
+    def append(self, layer):
+        self._layers.append(layer)
+
+    def insert(self, index, layer):
+        self._layers.insert(index, layer)
+
+    def remove(self, layer):
+        self._layers.remove(layer)
+
+    def pop(self, i=-1):
+        return self._layers.pop(i)
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        self._layers[index] = layer
+
+    def __delitem__(self, index):
+        del self._layers[index]
+
+    def __contains__(self, layer):
+        return layer in self._layers
+
+    def _draw(self, canvas, ox, oy, scale):
+        scale *= self.scale
+        ox += self.x * scale
+        oy += self.y * scale
+        for layer in self._layers:
+            if not layer.hidden:
+                layer._draw(canvas, ox, oy, scale)
+
+
+class Display:
+    """The board's built in display. Frames are composited on refresh."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rotation = 0
+        self.brightness = 1.0
+        self.auto_refresh = True
+        self.root_group = None
+        self.refreshes = 0
+
+    def render(self):
+        """The current screen contents as a (height, width, 3) uint8 array."""
+        canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        if self.root_group is not None and not self.root_group.hidden:
+            self.root_group._draw(canvas, 0, 0, 1)
+        return canvas
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.refreshes += 1
+        if _host.frame_sink is not None:
+            _host.frame_sink(self)
+        return True
+
+
+def release_displays():
+    pass
@@ -0,0 +1,33 @@
+"""supervisor stand-in, reading the scripted keyboard."""
+
+import time
+
+from hostsim import _host
+
+
+class _Runtime:  # pylint: disable=too-few-public-methods
+    @property
+    def serial_bytes_available(self):
+        if _host.keyboard is None:
+            return 0
+        return _host.keyboard.available
+
+    serial_connected = True
+    usb_connected = True
+
+
+runtime = _Runtime()
+
+# CircuitPython starts the ticks about 65 s before they wrap, so code that
+# assumes they start near 0 fails early; do the same
+_TICKS_START = (1 << 29) - 65_536
+
+
+def ticks_ms():
+    """Milliseconds since start, wrapping at 2**29 like CircuitPython."""
+    ms = (time.monotonic_ns() - _host.start_ns) // 1_000_000
+    return (_TICKS_START + ms) & ((1 << 29) - 1)
+
+
+def reload():
+    raise SystemExit("supervisor.reload()")
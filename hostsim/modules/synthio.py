@@ -0,0 +1,331 @@
+"""synthio stand-in rendering with NumPy.
+
+Follows the CircuitPython implementation where it matters for how things
+sound: LFOs, bends and envelopes advance once per 256 sample control tick,
+wave tables are read without interpolation, and a note pressed while it is
+still playing goes back to attack from its current level.
+"""
+
+import math
+import threading
+from collections import namedtuple
+
+import numpy as np
+from ulab.scipy.signal import sosfilt
+
+from hostsim import _host
+
+MAX_DUR = 256  # Samples per control tick
+MAX_POLYPHONY = 12
+
+_square = np.array([-32767] * 128 + [32767] * 128, dtype=np.int16)
+_triangle = np.array([0, 32767, 0, -32767], dtype=np.int16)
+
+
+def midi_to_hz(midi_note):
+    return 440.0 * 2 ** ((midi_note - 69) / 12)
+
+
+def voct_to_hz(ctrl):
+    return midi_to_hz(ctrl * 12 + 60)
+
+
+class Envelope(namedtuple("Envelope", "attack_time decay_time release_time attack_level sustain_level")):
+    """Read only, and indexable like the CircuitPython namedtuple."""
+
+    def __new__(cls, *, attack_time=0.1, decay_time=0.05, release_time=0.2,
+                attack_level=1.0, sustain_level=0.8):
+        return super().__new__(cls, attack_time, decay_time, release_time, attack_level, sustain_level)
+
+
+class LFO:
+    """Low frequency oscillator, ticked by the Synthesizer using it."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, waveform=None, *, rate=1.0, scale=1.0, offset=0.0,
+                 phase_offset=0.0, once=False, interpolate=True):
+        self.waveform = waveform
+        self.rate = rate
+        self.scale = scale
+        self.offset = offset
+        self.phase_offset = phase_offset
+        self.once = once
+        self.interpolate = interpolate
+        self._phase = 0.0
+        self._tick = -1
+        self.value = self._lookup()
+
+    @property
+    def phase(self):
+        return self._phase
+
+    def retrigger(self):
+        self._phase = 0.0
+        self.value = self._lookup()
+
+    def _lookup(self):
+        table = _triangle if self.waveform is None else self.waveform
+        size = len(table)
+        phase = (self._phase + self.phase_offset) % 1.0
+        if self.once:
+            if self._phase >= 1.0:
+                return self.offset + self.scale * int(table[-1]) / 32768
+            # A one shot runs from the first entry to the last, len - 1 segments
+            pos = phase * (size - 1)
+            i = int(pos)
+            j = min(i + 1, size - 1)
+        else:
+            pos = phase * size
+            i = int(pos) % size
+            j = (i + 1) % size
+        v = int(table[i])
+        if self.interpolate:
+            v += (int(table[j]) - v) * (pos - int(pos))
+        return self.offset + self.scale * v / 32768
+
+    def _advance(self, tick, dt):
+        """Move on one control tick, once per tick however many notes share it."""
+        if tick == self._tick:
+            return
+        self._tick = tick
+        self.value = self._lookup()
+        self._phase += self.rate * dt
+        if not self.once:
+            self._phase %= 1.0
+
+
+def _value(source):
+    return source.value if isinstance(source, LFO) else source
+
+
+class Biquad:  # pylint: disable=too-few-public-methods
+    def __init__(self, b0, b1, b2, a1, a2):
+        self.b0 = b0
+        self.b1 = b1
+        self.b2 = b2
+        self.a1 = a1
+        self.a2 = a2
+
+
+def _rbj(kind, frequency, q, sample_rate):
+    w0 = 2 * math.pi * min(frequency, sample_rate * 0.49) / sample_rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2 * q)
+    if kind == "lpf":
+        b0, b1, b2 = (1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2
+    elif kind == "hpf":
+        b0, b1, b2 = (1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2
+    else:
+        b0, b1, b2 = alpha, 0.0, -alpha
+    a0 = 1 + alpha
+    return Biquad(b0 / a0, b1 / a0, b2 / a0, -2 * cos_w0 / a0, (1 - alpha) / a0)
+
+
+class Note:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    def __init__(self, frequency, *, panning=0.0, waveform=None, envelope=None,
+                 amplitude=1.0, bend=0.0, filter=None,  # pylint: disable=redefined-builtin
+                 ring_frequency=0.0, ring_bend=0.0, ring_waveform=None):
+        self.frequency = frequency
+        self.panning = panning
+        self.waveform = waveform
+        self.envelope = envelope
+        self.amplitude = amplitude
+        self.bend = bend
+        self.filter = filter
+        self.ring_frequency = ring_frequency
+        self.ring_bend = ring_bend
+        self.ring_waveform = ring_waveform
+
+
+ATTACK, DECAY, SUSTAIN, RELEASE = range(4)
+
+
+class _Channel:  # pylint: disable=too-few-public-methods
+    def __init__(self, note):
+        self.note = note
+        self.state = ATTACK
+        self.level = 0.0
+        self.phase = 0.0  # In table entries
+        self.fresh = True  # Pressed since it was last rendered
+
+
+class Synthesizer:
+    max_polyphony = MAX_POLYPHONY
+
+    def __init__(self, *, sample_rate=11025, channel_count=1, waveform=None, envelope=None):
+        self.sample_rate = sample_rate
+        self.channel_count = channel_count
+        self.waveform = waveform
+        self.envelope = Envelope() if envelope is None else envelope
+        self.blocks = []
+        self._channels = []
+        self._filter_state = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    # Notes may be synthio.Note objects or MIDI note numbers
+    def _notes(self, notes):
+        if isinstance(notes, (Note, int)):
+            return (notes,)
+        return notes
+
+    def _find(self, note):
+        for channel in self._channels:
+            if channel.note is note or (isinstance(note, int) and channel.note == note):
+                return channel
+        return None
+
+    def press(self, notes=()):
+        _host.log("press")
+        with self._lock:
+            for note in self._notes(notes):
+                channel = self._find(note)
+                if channel is not None:
+                    # Already sounding: back to attack from the current level
+                    channel.state = ATTACK
+                    channel.fresh = True
+                elif len(self._channels) < self.max_polyphony:
+                    self._channels.append(_Channel(note))
+
+    def release(self, notes=()):
+        with self._lock:
+            for note in self._notes(notes):
+                channel = self._find(note)
+                if channel is not None:
+                    channel.state = RELEASE
+
+    def release_all(self):
+        with self._lock:
+            for channel in self._channels:
+                channel.state = RELEASE
+
+    def release_then_press(self, release=(), press=()):
+        self.release(release)
+        self.press(press)
+
+    def change(self, release=(), press=(), retrigger=True):
+        self.release(release)
+        if retrigger:
+            self.press(press)
+        else:
+            with self._lock:
+                for note in self._notes(press):
+                    if self._find(note) is None and len(self._channels) < self.max_polyphony:
+                        self._channels.append(_Channel(note))
+
+    def release_all_then_press(self, press=()):
+        self.release_all()
+        self.press(press)
+
+    @property
+    def pressed(self):
+        return tuple(c.note for c in self._channels if c.state != RELEASE)
+
+    def note_info(self, note):
+        channel = self._find(note)
+        if channel is None:
+            return (None, 0.0)
+        return (("attack", "decay", "sustain", "release")[channel.state], channel.level)
+
+    def low_pass_filter(self, frequency, Q=0.7071067811865475):  # pylint: disable=invalid-name
+        return _rbj("lpf", frequency, Q, self.sample_rate)
+
+    def high_pass_filter(self, frequency, Q=0.7071067811865475):  # pylint: disable=invalid-name
+        return _rbj("hpf", frequency, Q, self.sample_rate)
+
+    def band_pass_filter(self, frequency, Q=0.7071067811865475):  # pylint: disable=invalid-name
+        return _rbj("bpf", frequency, Q, self.sample_rate)
+
+    def deinit(self):
+        self._channels = []
+
+    # Host side
+
+    def _envelope(self, channel, dt):
+        """Advance one control tick. Returns the (start, end) levels."""
+        env = channel.note.envelope if isinstance(channel.note, Note) else None
+        env = self.envelope if env is None else env
+        start = channel.level
+        level = start
+        peak = env.attack_level
+        sustain = env.sustain_level * peak
+        if channel.state == ATTACK:
+            level = peak if env.attack_time <= 0 else level + peak * dt / env.attack_time
+            if level >= peak:
+                level = peak
+                channel.state = DECAY
+        elif channel.state == DECAY:
+            level = sustain if env.decay_time <= 0 else level - (peak - sustain) * dt / env.decay_time
+            if level <= sustain:
+                level = sustain
+                channel.state = SUSTAIN
+        elif channel.state == RELEASE:
+            level = 0.0 if env.release_time <= 0 else level - peak * dt / env.release_time
+            level = max(level, 0.0)
+        channel.level = level
+        return start, level
+
+    def _filter(self, biquad, x):
+        # Vectorized through the ulab.scipy.signal stand-in, with the
+        # filter state carried from one control tick to the next
+        state = self._filter_state.get(id(biquad))
+        if state is None or state[0] is not biquad:
+            sos = np.array([[biquad.b0, biquad.b1, biquad.b2, 1.0, biquad.a1, biquad.a2]])
+            state = [biquad, sos, np.zeros((1, 2))]
+        out, state[2] = sosfilt(state[1], x, zi=state[2])
+        self._filter_state[id(biquad)] = state
+        return out
+
+    def _render_tick(self, n):
+        dt = n / self.sample_rate
+        self._tick += 1
+        mix = np.zeros(n)
+        # Notes are summed per filter and each sum filtered once; the filter
+        # is linear so that matches filtering every note on its own
+        groups = {}
+        for channel in self._channels:
+            note = channel.note
+            if not isinstance(note, Note):
+                note = Note(midi_to_hz(note))
+            for source in (note.bend, note.amplitude):
+                if isinstance(source, LFO):
+                    source._advance(self._tick, dt)  # pylint: disable=protected-access
+            if channel.fresh:
+                channel.fresh = False
+                _host.log("sound")
+            start, end = self._envelope(channel, dt)
+            if start == 0 and end == 0:
+                continue
+            table = note.waveform
+            table = (_square if self.waveform is None else self.waveform) if table is None else table
+            size = len(table)
+            step = note.frequency * 2 ** _value(note.bend) * size / self.sample_rate
+            pos = channel.phase + step * np.arange(n)
+            channel.phase = (channel.phase + step * n) % size
+            wave = np.asarray(table, dtype=np.float64)[pos.astype(np.int64) % size]
+            out = wave * np.linspace(start, end, n, endpoint=False) * _value(note.amplitude)
+            key = id(note.filter)
+            if key in groups:
+                groups[key][1] += out
+            else:
+                groups[key] = [note.filter, out]
+        for biquad, out in groups.values():
+            mix += out if biquad is None else self._filter(biquad, out)
+        # Released notes that have faded out free their channel
+        self._channels = [c for c in self._channels if c.state != RELEASE or c.level > 0]
+        return mix
+
+    def _host_open(self, loop=False):  # pylint: disable=unused-argument
+        return self
+
+    def read(self, n):
+        """n samples of output as int16, channels interleaved."""
+        out = np.empty(n)
+        with self._lock:
+            for at in range(0, n, MAX_DUR):
+                size = min(MAX_DUR, n - at)
+                out[at:at + size] = self._render_tick(size)
+        out = np.clip(out, -32767, 32767).astype(np.int16)
+        if self.channel_count == 2:
+            out = np.repeat(out, 2)
+        return out
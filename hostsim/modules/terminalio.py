@@ -0,0 +1,3 @@
+"""terminalio stand-in."""
+
+FONT = None
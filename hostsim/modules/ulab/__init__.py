@@ -0,0 +1,3 @@
+"""ulab stand-in backed by NumPy."""
+
+__version__ = "6.5.0-hostsim"
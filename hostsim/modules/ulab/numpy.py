@@ -0,0 +1,52 @@
+"""ulab.numpy stand-in backed by NumPy.
+
+NumPy is a superset of what ulab offers; only the places where the two
+behave differently are adapted here.
+"""
+
+# pylint: disable=wildcard-import,unused-wildcard-import,redefined-builtin
+import numpy as _np
+from numpy import *
+
+# ulab's float dtype (float32 on most boards; float64 is close enough here)
+float = _np.float64
+bool = _np.bool_
+
+max = _np.max
+min = _np.min
+abs = _np.abs
+round = _np.round
+
+
+def array(values, dtype=None):
+    """Like numpy.array, but converting floats to an integer dtype truncates
+    toward zero and wraps, as the C casts in ulab do."""
+    result = _np.asarray(values)
+    if dtype is not None and _np.issubdtype(_np.dtype(dtype), _np.integer) and result.dtype.kind == "f":
+        result = _np.trunc(result).astype(_np.int64)
+    return _np.array(result, dtype=dtype)
+
+
+def frombuffer(buffer, dtype=float, count=-1, offset=0):
+    return _np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+
+
+class _Generator:
+    """ulab.numpy.random.Generator: a seeded generator with ulab's method
+    signatures."""
+
+    def __init__(self, seed=None):
+        self._rng = _np.random.default_rng(seed)
+
+    def random(self, size=None, out=None):
+        return self._rng.random(size)
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return self._rng.uniform(low, high, size)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        return self._rng.normal(loc, scale, size)
+
+
+class random:  # pylint: disable=invalid-name,too-few-public-methods
+    Generator = _Generator
@@ -0,0 +1 @@
+"""ulab.scipy stand-in."""
@@ -0,0 +1,76 @@
+"""ulab.scipy.signal stand-in."""
+
+import numpy as np
+
+try:
+    from scipy.signal import sosfilt as _sosfilt
+except ImportError:
+    _sosfilt = None
+
+# Without SciPy a section is run a block at a time: within a block its
+# output is the input convolved with its impulse response, plus the decay
+# of the state it started the block with
+BLOCK = 256
+
+# (h, g) per section coefficients, see _response()
+_responses = {}
+
+
+def _response(b0, b1, b2, a1, a2):
+    """The section's impulse response h and that of its poles alone g,
+    over BLOCK samples."""
+    key = (b0, b1, b2, a1, a2)
+    found = _responses.get(key)
+    if found is None:
+        g = np.empty(BLOCK)
+        g1 = g2 = 0.0
+        for i in range(BLOCK):
+            g[i] = (1.0 if i == 0 else 0.0) - a1 * g1 - a2 * g2
+            g2, g1 = g1, g[i]
+        h = b0 * g
+        h[1:] += b1 * g[:-1]
+        h[2:] += b2 * g[:-2]
+        if len(_responses) >= 64:
+            _responses.clear()
+        found = _responses[key] = (h, g)
+    return found
+
+
+def _biquad(row, x, z):
+    """One section, transposed direct form II as scipy and ulab run it.
+    z is the section's two state values, updated in place."""
+    b0, b1, b2, a0, a1, a2 = (float(v) for v in row)
+    if a0 != 1.0:
+        b0, b1, b2, a1, a2 = b0 / a0, b1 / a0, b2 / a0, a1 / a0, a2 / a0
+    h, g = _response(b0, b1, b2, a1, a2)
+    out = np.empty(len(x))
+    z0, z1 = float(z[0]), float(z[1])
+    for at in range(0, len(x), BLOCK):
+        block = x[at:at + BLOCK]
+        n = len(block)
+        y = np.convolve(block, h[:n])[:n] + z0 * g[:n]
+        y[1:] += z1 * g[:n - 1]
+        out[at:at + n] = y
+        # The state after the block's last sample, as the loop form leaves it
+        if n > 1:
+            z0 = b1 * block[-1] + b2 * block[-2] - a1 * y[-1] - a2 * y[-2]
+        else:
+            z0 = b1 * block[-1] - a1 * y[-1] + z1
+        z1 = b2 * block[-1] - a2 * y[-1]
+    z[0], z[1] = z0, z1
+    return out
+
+
+def sosfilt(sos, x, *, zi=None):
+    """Returns y, or (y, zf) when the filter state zi, shaped
+    (sections, 2), is given."""
+    sos = np.atleast_2d(np.asarray(sos, dtype=float))
+    x = np.asarray(x, dtype=float)
+    if _sosfilt is not None:
+        if zi is None:
+            return _sosfilt(sos, x)
+        return _sosfilt(sos, x, zi=np.asarray(zi, dtype=float))
+    z = np.zeros((len(sos), 2)) if zi is None else np.array(zi, dtype=float).reshape(len(sos), 2)
+    for row, state in zip(sos, z):
+        x = _biquad(row, x, state)
+    return x if zi is None else (x, z)
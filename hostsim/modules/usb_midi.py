@@ -0,0 +1,54 @@
+"""usb_midi stand-in. ports[0] is the input, ports[1] the output; the host
+side can queue bytes into the input with inject() and read what the code
+sent from the output's sent buffer."""
+
+import threading
+
+from hostsim import _host
+
+
+class PortIn:
+    def __init__(self):
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def inject(self, data):
+        with self._lock:
+            self._buffer += data
+        _host.log("midi_in")
+
+    def read(self, nbytes=None):
+        with self._lock:
+            if nbytes is None:
+                nbytes = len(self._buffer)
+            data = bytes(self._buffer[:nbytes])
+            del self._buffer[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        with self._lock:
+            n = min(len(buf) if nbytes is None else nbytes, len(self._buffer))
+            buf[:n] = self._buffer[:n]
+            del self._buffer[:n]
+        return n
+
+
+class PortOut:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.sent = bytearray()
+
+    def write(self, buf, nbytes=None):
+        data = bytes(buf if nbytes is None else buf[:nbytes])
+        self.sent += data
+        return len(data)
+
+
+ports = (PortIn(), PortOut())
+
+
+def enable():
+    pass
+
+
+def disable():
+    pass
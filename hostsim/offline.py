@@ -0,0 +1,153 @@
+"""Offline pattern renderer.
+
+Renders a pattern at a tempo with the drums voice definitions straight to
+a WAV file, much faster than real time. Each voice is rendered once as a
+one-shot with oneshot.render() (vectorized wave lookup, LFO bend,
+envelope and biquad), then every hit is mixed in as a slice addition, a
+chunk of output at a time, so long renders stream to disk in constant
+memory. As on the mixer, a new hit on a track cuts off the one before it.
+
+    python -m hostsim.offline --pattern "x...x...|xxxxxxxx|x.x...x." --bpm 240 --loops 4 kit.wav
+"""
+
+import contextlib
+import os
+import tempfile
+import time
+import wave
+
+from . import install
+
+install()
+
+
+@contextlib.contextmanager
+def _workdir():
+    """Run in a temp directory, as run() does, so anything the project
+    writes to its working directory (drums.TABLE_FILE) lands there and not
+    wherever the renderer was started. The directory is removed after."""
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="hostsim-") as workdir:
+        os.chdir(workdir)
+        try:
+            yield
+        finally:
+            os.chdir(old_cwd)
+
+
+# pylint: disable=wrong-import-position
+import numpy as np
+import synthio
+import oneshot
+import pattern
+
+with _workdir():
+    import drums
+
+TRACKS = ("snare", "hat", "kick")  # Track order used by code.py
+
+
+def make_voices(sample_rate=24000):
+    """The drum voices in track order, built as code.py builds them."""
+    synth = synthio.Synthesizer(channel_count=1, sample_rate=sample_rate)
+    return (drums.Snare(synth), drums.HighHat(synth), drums.KickDrum(synth))
+
+
+def parse(text):
+    """Pattern from rows of steps separated by '|' or newlines, with 'x'
+    (or any of 'X1*') for a hit and anything else for a rest."""
+    rows = [row.strip() for row in text.replace("\n", "|").split("|") if row.strip()]
+    seq = pattern.Pattern(len(rows), max(len(row) for row in rows))
+    seq.load([[c in "xX1*" for c in row] for row in rows])
+    return seq
+
+
+def _hits(seq, step_samples, loops):
+    """Per track, the sorted sample offsets of its hits."""
+    starts = []
+    for track in range(seq.tracks):
+        steps = [s for s in range(seq.steps) if seq.get(track, s)]
+        starts.append([int(round((loop * seq.steps + s) * step_samples))
+                       for loop in range(loops) for s in steps])
+    return starts
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def render_pattern(seq, bpm, path, voices=None, sample_rate=24000, steps_per_beat=1,
+                   loops=1, level=0.2, chunk=24000):
+    """Render loops of seq (a pattern.Pattern, a string for parse() or
+    rows of 0/1) at bpm to a mono 16-bit WAV at path. voices are the drum
+    objects in track order (make_voices() by default). Returns a dict of
+    samples written, seconds of audio and render time."""
+    began = time.perf_counter()
+    if isinstance(seq, str):
+        seq = parse(seq)
+    elif not isinstance(seq, pattern.Pattern):
+        rows = seq
+        seq = pattern.Pattern(len(rows), max(len(row) for row in rows))
+        seq.load(rows)
+    if voices is None:
+        voices = make_voices(sample_rate)
+
+    shots = [np.asarray(oneshot.render(v, sample_rate), dtype=np.float64) * level
+             for v in voices[:seq.tracks]]
+    step_samples = 60 * sample_rate / (bpm * steps_per_beat)
+    total = int(round(seq.steps * loops * step_samples))
+
+    # Each hit plays until its one-shot ends or the track's next hit
+    spans = []
+    for track, starts in enumerate(_hits(seq, step_samples, loops)):
+        if track >= len(shots):
+            break
+        shot = shots[track]
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else total
+            spans.append((start, min(start + len(shot), end, total), shot))
+    spans.sort(key=lambda span: span[0])
+
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        first = 0  # Spans before this one have finished
+        for lo in range(0, total, chunk):
+            hi = min(lo + chunk, total)
+            mix = np.zeros(hi - lo)
+            while first < len(spans) and spans[first][1] <= lo:
+                first += 1
+            for start, end, shot in spans[first:]:
+                if start >= hi:
+                    break
+                a = max(start, lo)
+                b = min(end, hi)
+                if b > a:
+                    mix[a - lo:b - lo] += shot[a - start:b - start]
+            out.writeframes(np.clip(mix, -32767, 32767).astype("<i2").tobytes())
+
+    elapsed = time.perf_counter() - began
+    return {"samples": total, "seconds": total / sample_rate, "render_s": elapsed,
+            "speed": total / sample_rate / max(elapsed, 1e-9)}
+
+
+def main():
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(prog="python -m hostsim.offline",
+                                     description="Render a drum pattern to a WAV file")
+    parser.add_argument("wav", help="output file")
+    parser.add_argument("--pattern", default="....x.......x...|x.x.x.x.x.x.x.x.|x.......x.x.....",
+                        help="rows for " + ", ".join(TRACKS) + ", separated by |")
+    parser.add_argument("--bpm", type=float, default=240)
+    parser.add_argument("--steps-per-beat", type=int, default=1)
+    parser.add_argument("--loops", type=int, default=1)
+    parser.add_argument("--level", type=float, default=0.2, help="mixer level of every track")
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    args = parser.parse_args()
+
+    result = render_pattern(args.pattern, args.bpm, args.wav, sample_rate=args.sample_rate,
+                            steps_per_beat=args.steps_per_beat, loops=args.loops, level=args.level)
+    print("{samples} samples ({seconds:.1f} s) in {render_s:.3f} s, {speed:.0f}x real time".format(**result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""Minimal PNG writer, so frames can be saved without extra packages."""
+
+import struct
+import zlib
+
+
+def _chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+
+def write_png(path, rgb):
+    """Write an (height, width, 3) uint8 array as an RGB PNG."""
+    height, width = rgb.shape[:2]
+    rows = b"".join(b"\x00" + rgb[y].tobytes() for y in range(height))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(rows, 6)))
+        f.write(_chunk(b"IEND", b""))
@@ -0,0 +1,111 @@
+"""Decode profiler dumps into per-hook statistics and histograms.
+
+Reads serial output (a file, or stdin) containing the "PRF:" lines that
+profiler.Profiler.dump() prints, and for each hook shows call count,
+duration percentiles and a log2 histogram of durations, plus lateness
+after the deadline of the step played last and bytes allocated per call.
+
+    python -m hostsim.profdecode serial.log
+    python -m hostsim.profdecode --last serial.log
+"""
+
+import argparse
+import binascii
+import struct
+import sys
+
+MAGIC = b"PRF1"
+HEADER = "<4sBH"
+RECORD = "<BIii"
+PREFIX = "PRF:"
+
+
+def decode(frame):
+    """Returns (names, records), each record an (id, duration us,
+    lateness us, bytes allocated) tuple, oldest first."""
+    magic, name_count, count = struct.unpack_from(HEADER, frame)
+    if magic != MAGIC:
+        raise ValueError("not a profiler frame")
+    at = struct.calcsize(HEADER)
+    names = []
+    for _ in range(name_count):
+        size = frame[at]
+        names.append(frame[at + 1:at + 1 + size].decode())
+        at += 1 + size
+    size = struct.calcsize(RECORD)
+    if len(frame) - at != count * size:
+        raise ValueError("truncated profiler frame")
+    records = [struct.unpack_from(RECORD, frame, at + i * size) for i in range(count)]
+    return names, records
+
+
+def frames(lines):
+    """Decoded frames from every PRF: line in an iterable of text lines."""
+    for line in lines:
+        at = line.find(PREFIX)
+        if at >= 0:
+            yield decode(binascii.a2b_base64(line[at + len(PREFIX):].strip()))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def histogram(values, width=40):
+    """Lines of a log2 bucket histogram: [lo, hi) us and a bar."""
+    buckets = {}
+    for v in values:
+        bucket = max(int(v), 0).bit_length()
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    most = max(buckets.values())
+    lines = []
+    for bucket in range(min(buckets), max(buckets) + 1):
+        n = buckets.get(bucket, 0)
+        lo = 0 if bucket == 0 else 1 << (bucket - 1)
+        lines.append("  {:>7d}-{:<7d} {:6d} {}".format(lo, (1 << bucket) - 1, n, "#" * (n * width // most)))
+    return lines
+
+
+def report(names, records):
+    lines = []
+    for hook, name in enumerate(names):
+        rows = [r for r in records if r[0] == hook]
+        if not rows:
+            continue
+        durations = [r[1] for r in rows]
+        late = [r[2] for r in rows]
+        allocated = [r[3] for r in rows]
+        lines.append("{}: {} calls, duration us p50 {} p90 {} p99 {} max {}".format(
+            name, len(rows), percentile(durations, 0.5), percentile(durations, 0.9),
+            percentile(durations, 0.99), max(durations)))
+        lines.append("  late us p50 {} max {}, bytes allocated mean {:.0f} max {}".format(
+            percentile(late, 0.5), max(late), sum(allocated) / len(allocated), max(allocated)))
+        lines.extend(histogram(durations))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m hostsim.profdecode",
+                                     description="Decode profiler dumps from serial output")
+    parser.add_argument("log", nargs="?", help="captured serial output (default stdin)")
+    parser.add_argument("--last", action="store_true", help="only the last dump")
+    args = parser.parse_args()
+
+    if args.log:
+        with open(args.log) as f:
+            decoded = list(frames(f))
+    else:
+        decoded = list(frames(sys.stdin))
+    if not decoded:
+        sys.exit("no PRF: lines found")
+    if args.last:
+        decoded = decoded[-1:]
+    for i, (names, records) in enumerate(decoded):
+        print("dump {} ({} records)".format(i + 1, len(records)))
+        for line in report(names, records):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
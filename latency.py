@@ -0,0 +1,78 @@
+# Audio latency profiles
+#
+# audiomixer.Mixer fills two buffers of buffer_size bytes in turn, playing
+# one while the background task refills the other. A hit is heard once the
+# buffer it lands in reaches the DAC, so latency is up to two buffers, and
+# if a refill is held up for longer than one buffer plays the output runs
+# dry. Smaller buffers answer faster but leave less room for a slow
+# display refresh or render; a lower sample rate makes each refill cheaper
+# and each byte last longer.
+#
+# The refill runs as a background task, which CircuitPython gets to
+# between bytecodes, so a long stretch of Python code does not hold it
+# up; one long call into native code does: a display refresh,
+# gc.collect(), a large ulab operation. StallMonitor counts those calls
+# running longer than a buffer lasts. Refresher, Collector and
+# ScopeMonitor time their native work and report it through their stalls
+# attribute. Run with debug_enabled and each profile to pick the smallest
+# buffer that keeps it at zero stalls with the whole kit playing.
+
+BYTES_PER_SAMPLE = 2
+
+
+class Profile:
+    def __init__(self, name, sample_rate, buffer_size):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size  # Bytes, per buffer of the two
+
+    def buffer_ms(self, channel_count=1):
+        """Time one buffer plays for, in ms."""
+        samples = self.buffer_size // (BYTES_PER_SAMPLE * channel_count)
+        return samples * 1000 / self.sample_rate
+
+    def latency_ms(self, channel_count=1):
+        """Longest a hit can wait to be heard: both buffers."""
+        return 2 * self.buffer_ms(channel_count)
+
+
+PROFILES = {
+    # 256 samples, about 12 ms a buffer
+    "low": Profile("low", 22050, 512),
+    # 512 samples, about 23 ms a buffer
+    "balanced": Profile("balanced", 22050, 1024),
+    # The original setup: 2048 samples, about 85 ms a buffer
+    "safe": Profile("safe", 24000, 4096),
+}
+
+
+class StallMonitor:
+    """Counts native calls that took longer than an audio buffer.
+
+    The caller times the call and passes its duration to check(), in
+    whole ms, so this allocates nothing unless it logs."""
+
+    def __init__(self, profile, channel_count=1, log=None):
+        self.profile = profile
+        self.budget_ms = int(profile.buffer_ms(channel_count))
+        self.log = log
+        self.stalls = 0
+        self.max_ms = 0     # Longest call seen
+        self.calls = 0
+
+    def check(self, busy, name="call"):
+        """Count a call that took busy ms. Returns True if it ran long
+        enough to have starved the audio buffer."""
+        self.calls += 1
+        if busy > self.max_ms:
+            self.max_ms = busy
+        if busy <= self.budget_ms:
+            return False
+        self.stalls += 1
+        if self.log is not None:
+            self.log("audio stall: " + name + " " + str(busy) + " ms, buffer " + str(self.budget_ms) + " ms")
+        return True
+
+    def stats(self):
+        return "audio {}: {} stalls in {} calls, max {} ms, buffer {} ms".format(
+            self.profile.name, self.stalls, self.calls, self.max_ms, self.budget_ms)
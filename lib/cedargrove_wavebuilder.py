@@ -27,7 +27,7 @@ Implementation Notes
   https://circuitpython.org/downloads
 """
 
-import random
+import os
 import ulab.numpy as np
 
 
@@ -42,6 +42,56 @@ class WaveShape:
     Triangle = "triangle"
 
 
+class TableCache:
+    """A least recently used cache of ``int16`` wave table arrays, limited
+    to a total number of bytes.
+
+    :param integer max_bytes: The maximum total size of the cached arrays in
+    bytes. Least recently used arrays are discarded to stay within the limit."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self._tables = {}
+        self._order = []  # Least recently used key first
+
+    def get(self, key):
+        """Returns the cached array for key, or ``None``."""
+        table = self._tables.get(key)
+        if table is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._order[-1] != key:
+            self._order.remove(key)
+            self._order.append(key)
+        return table
+
+    def put(self, key, table):
+        """Adds an array to the cache, discarding the least recently used
+        arrays as needed. Arrays larger than max_bytes are not cached."""
+        size = len(table) * 2
+        if size > self.max_bytes or key in self._tables:
+            return
+        while self._order and self.bytes_used + size > self.max_bytes:
+            old_key = self._order.pop(0)
+            self.bytes_used -= len(self._tables.pop(old_key)) * 2
+        self._tables[key] = table
+        self._order.append(key)
+        self.bytes_used += size
+
+    def clear(self):
+        """Discards all cached arrays."""
+        self._tables = {}
+        self._order = []
+        self.bytes_used = 0
+
+    def __len__(self):
+        return len(self._order)
+
+
 class WaveBuilder:
     """The WaveBuilder class creates a composite ``synthio`` waveform table
     from a collection of oscillators. The table is created from a list
@@ -71,8 +121,28 @@ class WaveBuilder:
     :param boolean loop_smoothing: Smooth the transition between the start
     and end of the waveform table to reduce loop distortion. Defaults
     to ``True`` (smooth the last two sample values in the waveform table).
+    Band-limited tables without noise are already periodic and are never
+    smoothed.
     :param bool debug: A boolean value to enable debug print messages.
-    Defaults to ``False`` (no debug print messages)."""
+    Defaults to ``False`` (no debug print messages).
+    :param bool band_limited: Build square, saw, and triangle oscillators
+    from a truncated harmonic series instead of straight line segments so
+    that the table does not alias when played up to ``top_frequency``.
+    Defaults to ``False`` (naive wave shapes).
+    :param float top_frequency: The highest fundamental frequency in Hertz
+    that the band-limited table will be played at. Defaults to 2093.0 (C7).
+    :param integer sample_rate: The synthesizer sample rate used to find the
+    Nyquist limit for band-limited tables. Defaults to 24000.
+    :param bool use_cache: Reuse oscillator waveforms and finished wave tables
+    from ``WaveBuilder.component_cache`` and ``WaveBuilder.table_cache``.
+    Cached wave tables are kept alive by the caches and shared between
+    instances, so they must not be modified in place. Defaults to ``False``
+    (no caching, nothing is kept)."""
+
+    # Shared by the instances built with use_cache=True, and only filled by
+    # them; replace or resize to suit the available memory
+    component_cache = TableCache(16 * 1024)
+    table_cache = TableCache(32 * 1024)
 
     # pylint: disable=too-many-arguments
     def __init__(
@@ -83,6 +153,10 @@ class WaveBuilder:
         lambda_factor=1.0,
         loop_smoothing=True,
         debug=False,
+        band_limited=False,
+        top_frequency=2093.0,
+        sample_rate=24000,
+        use_cache=False,
     ):
         self._oscillators = oscillators
         self._table_length = table_length
@@ -90,6 +164,10 @@ class WaveBuilder:
         self._lambda_factor = lambda_factor
         self._loop_smoothing = loop_smoothing
         self._debug = debug
+        self._band_limited = band_limited
+        self._top_frequency = top_frequency
+        self._sample_rate = sample_rate
+        self._use_cache = use_cache
 
         self._update_table()
 
@@ -155,6 +233,37 @@ class WaveBuilder:
     def debug(self, new_debug):
         self._debug = new_debug
 
+    @property
+    def band_limited(self):
+        """Build square, saw, and triangle oscillators from a truncated
+        harmonic series."""
+        return self._band_limited
+
+    @band_limited.setter
+    def band_limited(self, new_band_limited):
+        self._band_limited = new_band_limited
+        self._update_table()
+
+    @property
+    def top_frequency(self):
+        """The highest frequency in Hertz a band-limited table is built for."""
+        return self._top_frequency
+
+    @top_frequency.setter
+    def top_frequency(self, new_top_frequency=2093.0):
+        self._top_frequency = new_top_frequency
+        self._update_table()
+
+    @property
+    def sample_rate(self):
+        """The synthesizer sample rate used for band-limited tables."""
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, new_sample_rate=24000):
+        self._sample_rate = new_sample_rate
+        self._update_table()
+
     @property
     def wave_table(self):
         """The composite waveform wave table; synthio.ReadableBuffer of type
@@ -179,29 +288,34 @@ class WaveBuilder:
         amp_factor = abs(
             min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
         )
-        _temporary = np.array(
-            [
-                random.randint(-amp_factor, amp_factor)
-                for _ in range(self._table_length)
-            ],
-            dtype=np.int16,
-        )
+        # Scale a buffer of random signed 16-bit values in one pass
+        _temporary = np.frombuffer(os.urandom(self._table_length * 2), dtype=np.int16)
+        _temporary = np.array(_temporary * (amp_factor / 32768), dtype=np.int16)
         return _temporary
 
+    def _tile(self, period):
+        """Returns a waveform array of table_length samples built by repeating
+        a one-lambda period array. The array doubles on each pass so that the
+        build is linear in table_length rather than quadratic."""
+        _temporary = period
+        while len(_temporary) < self._table_length:
+            _temporary = np.concatenate((_temporary, _temporary))
+
+        # Truncate the temporary array to match table_length
+        return _temporary[: self._table_length]
+
     def _saw_wave(self, ratio, amplitude):
         """Returns a waveform array with a saw wave waveform proportional
         to the frequency ratio and adjusted to a specified amplitude."""
         amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
-        _temporary = np.array([], dtype=np.int16)  # Create a zero-length array
 
         # Calculate the array length and subtract the initial zero element
         half_lambda = int((self._table_length / (self._lambda_factor * 2)) / ratio)
 
-        # Build the waveform array from a full-lambda waveform
-        while len(_temporary) < self._table_length:
-            _temporary = np.concatenate(
+        # Build a full-lambda waveform and repeat it to fill the table
+        return self._tile(
+            np.concatenate(
                 (
-                    _temporary,
                     np.linspace(
                         0,
                         int(amp_factor),
@@ -217,10 +331,7 @@ class WaveBuilder:
                     ),
                 )
             )
-
-        # Truncate the temporary array to match table_length
-        _temporary = _temporary[: self._table_length]
-        return _temporary
+        )
 
     def _sine_wave(self, ratio, amplitude):
         """Returns a waveform array with a sine wave waveform proportional
@@ -244,46 +355,36 @@ class WaveBuilder:
         """Returns a waveform array with a square wave waveform proportional
         to the frequency ratio and adjusted to a specified amplitude."""
         amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
-        # Create a zero-length temporary array
-        _temporary = np.array([], dtype=np.int16)
 
         # Calculate the sample length of one-half lambda
         half_lambda = int((self._table_length / (self._lambda_factor * 2)) / ratio)
 
-        # Build the waveform array from a full-lambda waveform
-        while len(_temporary) < self._table_length:
-            _temporary = np.concatenate(
+        # Build a full-lambda waveform and repeat it to fill the table
+        return self._tile(
+            np.concatenate(
                 (
-                    _temporary,
                     np.array([0], dtype=np.int16),
                     np.ones(half_lambda - 1, dtype=np.int16) * int(amp_factor),
                     np.array([0], dtype=np.int16),
                     np.ones(half_lambda - 1, dtype=np.int16) * int(-amp_factor),
                 )
             )
-
-        # Truncate the temporary array to match table_length
-        _temporary = _temporary[: self._table_length]
-        return _temporary
+        )
 
     def _triangle_wave(self, ratio, amplitude):
         """Returns a waveform array with a triangle wave waveform proportional
         to the frequency ratio and adjusted to a specified amplitude."""
         amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
-        # Create a zero-length temporary array
-        _temporary = np.array([], dtype=np.int16)
-
         # Calculate the sample length of one-quarter lambda
         quarter_lambda = int((self._table_length / (self._lambda_factor * 4)) / ratio)
 
         # Calculate a one-step increment for even quarter-lambda segments
         increment = int(amp_factor / quarter_lambda)
 
-        # Build the waveform array from a full-lambda waveform
-        while len(_temporary) < self._table_length:
-            _temporary = np.concatenate(
+        # Build a full-lambda waveform and repeat it to fill the table
+        return self._tile(
+            np.concatenate(
                 (
-                    _temporary,
                     np.linspace(
                         0,
                         amp_factor,
@@ -310,10 +411,104 @@ class WaveBuilder:
                     ),
                 )
             )
+        )
 
-        # Truncate the temporary array to match table_length
-        _temporary = _temporary[: self._table_length]
-        return _temporary
+    def _harmonic_count(self, ratio):
+        """Returns the number of harmonics of an oscillator that stay below
+        the Nyquist frequency at top_frequency and that the table length can
+        represent."""
+        audible = int((self._sample_rate / 2) / (self._top_frequency * ratio))
+        in_table = int(self._table_length / (2 * self._lambda_factor * ratio)) - 1
+        return max(1, min(audible, in_table))
+
+    def _band_limited_wave(self, wave_shape, ratio, amplitude):
+        """Returns a waveform array with a band-limited square, saw, or
+        triangle waveform proportional to the frequency ratio and peak
+        adjusted to a specified amplitude."""
+        amp_factor = min(int(round(self._sample_max * amplitude, 0)), self._sample_max)
+        count = self._harmonic_count(ratio)
+
+        # Fourier series coefficient for each harmonic number
+        coefficients = []
+        for k in range(1, count + 1):
+            if wave_shape == WaveShape.Saw:
+                coefficients.append((1 if k % 2 else -1) / k)
+            elif k % 2 == 0:
+                coefficients.append(0)  # Square and triangle have odd harmonics only
+            elif wave_shape == WaveShape.Square:
+                coefficients.append(1 / k)
+            else:
+                coefficients.append((1 if k % 4 == 1 else -1) / (k * k))
+
+        phase = np.linspace(
+            0,
+            self._lambda_factor * 2 * np.pi * ratio,
+            self._table_length,
+            endpoint=False,
+        ).reshape((1, self._table_length))
+
+        # Sum all harmonics as one matrix product, in blocks of rows to
+        # bound the size of the sine matrix
+        _temporary = np.zeros(self._table_length)
+        block = 32
+        for first in range(0, count, block):
+            rows = min(block, count - first)
+            harmonics = np.linspace(first + 1, first + rows, rows).reshape((rows, 1))
+            weights = np.array([coefficients[first : first + rows]])
+            _temporary = _temporary + np.dot(weights, np.sin(harmonics * phase)).flatten()
+
+        # Normalize the peak (including Gibbs overshoot) to the amplitude
+        peak = np.max(abs(_temporary))
+        if peak > 0:
+            _temporary = _temporary * (amp_factor / peak)
+        return np.array(_temporary, dtype=np.int16)
+
+    def _band_key(self):
+        """Returns the band-limiting parameters that affect a wave table."""
+        if self._band_limited:
+            return (True, self._top_frequency, self._sample_rate)
+        return (False,)
+
+    def _build_component(self, wave_type, ratio, amplitude):
+        """Returns the waveform array of a single oscillator."""
+        if self._band_limited and wave_type in (
+            WaveShape.Saw,
+            WaveShape.Square,
+            WaveShape.Triangle,
+        ):
+            return self._band_limited_wave(wave_type, ratio, amplitude)
+        if wave_type == WaveShape.Noise:
+            return self._noise_wave(ratio, amplitude)
+        if wave_type == WaveShape.Saw:
+            return self._saw_wave(ratio, amplitude)
+        if wave_type == WaveShape.Sine:
+            return self._sine_wave(ratio, amplitude)
+        if wave_type == WaveShape.Square:
+            return self._square_wave(ratio, amplitude)
+        if wave_type == WaveShape.Triangle:
+            return self._triangle_wave(ratio, amplitude)
+        return np.zeros(self._table_length, dtype=np.int16)
+
+    def _component(self, wave_type, ratio, amplitude):
+        """Returns the waveform array of a single oscillator, reusing a
+        previously built array with the same characteristics. Noise is
+        always built fresh."""
+        if not self._use_cache or wave_type == WaveShape.Noise:
+            return self._build_component(wave_type, ratio, amplitude)
+
+        key = (
+            wave_type,
+            ratio,
+            amplitude,
+            self._table_length,
+            self._lambda_factor,
+            self._sample_max,
+        ) + self._band_key()
+        component = WaveBuilder.component_cache.get(key)
+        if component is None:
+            component = self._build_component(wave_type, ratio, amplitude)
+            WaveBuilder.component_cache.put(key, component)
+        return component
 
     # pylint: disable=consider-using-generator
     # pylint: disable=too-many-branches
@@ -351,24 +546,41 @@ class WaveBuilder:
                     + message
                 )
 
-        # Add oscillator waveforms to an empty self._waveform wave table array
-        self._waveform = np.zeros(self._table_length, dtype=np.int16)
-        for wave_type, ratio, amplitude in self._oscillators:
-            if wave_type == WaveShape.Noise:
-                self._waveform = self._waveform + self._noise_wave(ratio, amplitude)
-            if wave_type == WaveShape.Saw:
-                self._waveform = self._waveform + self._saw_wave(ratio, amplitude)
-            if wave_type == WaveShape.Sine:
-                self._waveform = self._waveform + self._sine_wave(ratio, amplitude)
-            if wave_type == WaveShape.Square:
-                self._waveform = self._waveform + self._square_wave(ratio, amplitude)
-            if wave_type == WaveShape.Triangle:
-                self._waveform = self._waveform + self._triangle_wave(ratio, amplitude)
-
-        if self._loop_smoothing and (self._waveform[-1] != self._waveform[0]):
-            # Reduce loop distortion by smoothing the last 2 elements of the array
-            self._waveform[-2] = int((self._waveform[-2] + self._waveform[0]) / 2)
-            self._waveform[-1] = self._waveform[0]
+        table_key = None
+        self._waveform = None
+        if self._use_cache and WaveShape.Noise not in [osc[0] for osc in self._oscillators]:
+            table_key = (
+                tuple(self._oscillators),
+                self._table_length,
+                self._sample_max,
+                self._lambda_factor,
+                self._loop_smoothing,
+            ) + self._band_key()
+            self._waveform = WaveBuilder.table_cache.get(table_key)
+
+        if self._waveform is None:
+            # Add oscillator waveforms to an empty self._waveform wave table array
+            self._waveform = np.zeros(self._table_length, dtype=np.int16)
+            for wave_type, ratio, amplitude in self._oscillators:
+                self._waveform = self._waveform + self._component(
+                    wave_type, ratio, amplitude
+                )
+
+            # A band-limited table loops exactly; smoothing would only add a kink
+            periodic = self._band_limited and WaveShape.Noise not in [
+                osc[0] for osc in self._oscillators
+            ]
+            if (
+                self._loop_smoothing
+                and not periodic
+                and (self._waveform[-1] != self._waveform[0])
+            ):
+                # Reduce loop distortion by smoothing the last 2 elements of the array
+                self._waveform[-2] = int((self._waveform[-2] + self._waveform[0]) / 2)
+                self._waveform[-1] = self._waveform[0]
+
+            if table_key is not None:
+                WaveBuilder.table_cache.put(table_key, self._waveform)
 
         # Calculate loop distortion
         self._loop_distortion = (
@@ -381,5 +593,215 @@ class WaveBuilder:
             print(f"sample_max: {self._sample_max}")
             print(f"lambda_factor: {self._lambda_factor}")
             print(f"loop_smoothing: {self._loop_smoothing}")
+            print(f"band_limited: {self._band_limited}")
+            if self._band_limited:
+                print(f"top_frequency: {self._top_frequency}")
+                print(f"sample_rate: {self._sample_rate}")
             print(f"summed_amplitude: {self._summed_amplitude}")
             print(f"loop_distortion: {self._loop_distortion:3.1f}%")
+
+
+class WaveBank:
+    """The WaveBank class builds a collection of wave tables into one
+    preallocated ``int16`` array and hands each table out as a ``memoryview``
+    slice of that array. A slice can be assigned directly to
+    ``synthio.Note.waveform``. Keeping a kit or patch library in a single
+    allocation avoids fragmenting the heap with many separate tables.
+
+    :param list specs: A list of wave table specifications. Each
+    specification is either a list of oscillator tuples (see ``WaveBuilder``)
+    or a dictionary of ``WaveBuilder`` keyword arguments that includes
+    ``oscillators`` and optionally ``table_length``. Defaults to an empty list.
+    :param integer table_length: The table length used for specifications
+    that do not define one. Defaults to 256.
+    :param integer capacity: The total number of samples to preallocate.
+    Defaults to the summed length of the specifications.
+    :param builder_kwargs: Additional keyword arguments passed to
+    ``WaveBuilder`` for every table. Pass ``use_cache=True`` to reuse cached
+    oscillator waveforms; finished tables are copied into the bank."""
+
+    def __init__(self, specs=(), table_length=256, capacity=None, **builder_kwargs):
+        self._table_length = table_length
+        self._builder_kwargs = builder_kwargs
+
+        if capacity is None:
+            capacity = 0
+            for spec in specs:
+                capacity += self._spec_length(spec)
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._view = memoryview(self._buffer)
+        self._used = 0
+        self._tables = []
+
+        for spec in specs:
+            self.append(spec)
+
+    def _spec_length(self, spec):
+        if isinstance(spec, dict):
+            return spec.get("table_length", self._table_length)
+        return self._table_length
+
+    def append(self, spec):
+        """Builds a wave table from a specification into the next free space
+        in the bank and returns its ``memoryview``."""
+        if isinstance(spec, dict):
+            kwargs = dict(self._builder_kwargs)
+            kwargs.update(spec)
+            oscillators = kwargs.pop("oscillators")
+            length = kwargs.pop("table_length", self._table_length)
+        else:
+            kwargs = self._builder_kwargs
+            oscillators = spec
+            length = self._table_length
+
+        if self._used + length > len(self._buffer):
+            raise ValueError(
+                f"WaveBank capacity of {len(self._buffer)} samples exceeded."
+            )
+
+        start = self._used
+        self._buffer[start : start + length] = WaveBuilder(
+            list(oscillators), length, **kwargs
+        ).wave_table
+        self._used += length
+        table = self._view[start : start + length]
+        self._tables.append(table)
+        return table
+
+    def __getitem__(self, index):
+        return self._tables[index]
+
+    def __len__(self):
+        return len(self._tables)
+
+    @property
+    def tables(self):
+        """The list of wave table ``memoryview`` objects in build order."""
+        return self._tables
+
+    @property
+    def buffer(self):
+        """The underlying ``int16`` array holding every table."""
+        return self._buffer
+
+    @property
+    def capacity(self):
+        """The number of samples preallocated for the bank."""
+        return len(self._buffer)
+
+    @property
+    def samples_used(self):
+        """The number of samples occupied by built tables."""
+        return self._used
+
+    @property
+    def memory_used(self):
+        """The size of the preallocated bank in bytes."""
+        return len(self._buffer) * 2
+
+
+class WaveMorph:
+    """The WaveMorph class precomputes a sweep of interpolated wave tables
+    between two or more source tables (for example, sine to saw) into one
+    ``int16`` bank. Changing timbre while a note plays is then only a matter
+    of assigning a precomputed frame to ``synthio.Note.waveform``.
+
+    :param list tables: Two or more source wave tables of equal length, as
+    ``WaveBuilder.wave_table`` arrays, ``WaveBank`` slices, or any buffer of
+    type 'h' (signed 16 bit). The sweep passes through each source table in
+    order. No default.
+    :param integer frames: The number of frames precomputed across the whole
+    sweep, including the end points. Memory used is frames times the table
+    length times two bytes. Defaults to 16."""
+
+    def __init__(self, tables, frames=16):
+        if len(tables) < 2:
+            raise ValueError("WaveMorph requires at least two tables.")
+        self._table_length = len(tables[0])
+        for table in tables:
+            if len(table) != self._table_length:
+                raise ValueError("WaveMorph tables must be the same length.")
+        frames = max(frames, len(tables))
+
+        sources = [
+            np.array(np.frombuffer(table, dtype=np.int16), dtype=np.float)
+            for table in tables
+        ]
+
+        length = self._table_length
+        segments = len(sources) - 1
+        self._bank = np.zeros(frames * length, dtype=np.int16)
+        view = memoryview(self._bank)
+        self._frames = []
+        for index in range(frames):
+            position = index * segments / (frames - 1)
+            segment = min(int(position), segments - 1)
+            fraction = position - segment
+            frame = sources[segment] * (1 - fraction) + sources[segment + 1] * fraction
+            self._bank[index * length : (index + 1) * length] = np.array(
+                frame, dtype=np.int16
+            )
+            self._frames.append(view[index * length : (index + 1) * length])
+        self._index = 0
+
+    def __getitem__(self, index):
+        return self._frames[index]
+
+    def __len__(self):
+        return len(self._frames)
+
+    def frame(self, position):
+        """Returns the frame nearest to a sweep position from 0.0 (first
+        source table) to 1.0 (last source table). Positions outside the
+        range are clamped."""
+        position = min(max(position, 0.0), 1.0)
+        self._index = int(position * (len(self._frames) - 1) + 0.5)
+        return self._frames[self._index]
+
+    @property
+    def index(self):
+        """The index of the frame most recently returned by ``frame()``."""
+        return self._index
+
+    @property
+    def memory_used(self):
+        """The size of the frame bank in bytes."""
+        return len(self._bank) * 2
+
+    async def modulate(self, note, source, control_rate=50):
+        """Steps ``note.waveform`` through the frames at a fixed control rate
+        until the task is cancelled. The sweep position is read from source
+        on each tick; source is either a callable returning 0.0 to 1.0 or an
+        object with a ``value`` property, such as a ``synthio.LFO`` with
+        ``offset=0.5`` and ``scale=0.5`` that has been added to the
+        synthesizer's ``blocks`` so that it runs.
+
+        :param synthio.Note note: The note to modulate. No default.
+        :param source: The sweep position source. No default.
+        :param integer control_rate: Waveform updates per second. Ticks are
+        scheduled from absolute deadlines so the rate does not drift.
+        Defaults to 50."""
+        # pylint: disable=import-outside-toplevel
+        import time
+        import asyncio
+
+        period = 1_000_000_000 // control_rate
+        deadline = time.monotonic_ns()
+        current = -1
+        while True:
+            if callable(source):
+                position = source()
+            else:
+                position = source.value
+            frame = self.frame(position)
+            if self._index != current:
+                note.waveform = frame
+                current = self._index
+
+            deadline += period
+            delay = deadline - time.monotonic_ns()
+            if delay < 0:
+                # Fell behind; resynchronize rather than bunching up ticks
+                deadline -= delay
+                delay = 0
+            await asyncio.sleep(delay / 1_000_000_000)
@@ -18,6 +18,7 @@ https://docs.circuitpython.org/en/latest/shared-bindings/displayio/#displayio.Ti
 Implementation Notes
 --------------------
 **Software and Dependencies:**
+* ulab for CircuitPython
 * Adafruit CircuitPython firmware for the supported boards:
   https://circuitpython.org/downloads
 """
@@ -26,6 +27,7 @@ from array import array
 import displayio
 import synthio
 import bitmaptools
+import ulab.numpy as np
 
 
 # pylint: disable=too-few-public-methods
@@ -74,6 +76,8 @@ class WaveViz(displayio.TileGrid):
         self._auto_scale = auto_scale
         self._max_sample_value = 32767  # Maximum signed 16-bit value
         self._scale_y = 0  # Define for later use
+        self._top = None  # Plotted span of each column, for partial redraws
+        self._bottom = None
 
         if isinstance(self._wave_table, synthio.Envelope):
             self._envelope_plot = True
@@ -105,12 +109,18 @@ class WaveViz(displayio.TileGrid):
 
     @wave_table.setter
     def wave_table(self, new_wave_table):
+        was_envelope_plot = self._envelope_plot
         self._wave_table = new_wave_table
         if isinstance(self._wave_table, synthio.Envelope):
             self._envelope_plot = True
         else:
             self._envelope_plot = False
-        self._update_plot()
+
+        if self._envelope_plot or was_envelope_plot or self._top is None:
+            self._update_plot()
+        else:
+            # Only redraw the columns whose plotted span changed
+            self._redraw_wave()
 
     @property
     def width(self):
@@ -200,25 +210,39 @@ class WaveViz(displayio.TileGrid):
             False,
         )
 
-    def _plot_wave(self):
-        """Plot the wave_table as a bitmap. Extract samples from the wave
-        table to fill the bitmap object's x-axis. Y-axis scale factor is
-        determined from the extracted sample values."""
-        samples = len(self._wave_table)  # Samples in wave table
-
-        # Create and fill the polygon arrays
-        x_points = array("h", [])
-        y_points = array("h", [])
-        for x in range(self._width):
-            x_points.append(x)
-            table_idx = int(x * (samples / self._width))
-            y_points.append(self._wave_table[table_idx])
-        # Update the final point
-        y_points[-1] = self._wave_table[-1]
+    def _wave_spans(self):
+        """Decimate the wave table to one vertical span per bitmap column.
+        Each column spans the minimum to maximum sample value it covers so
+        that peaks between columns are not lost. Returns the top and bottom
+        pixel rows of each column's span."""
+        table = np.frombuffer(self._wave_table, dtype=np.int16)
+        samples = len(table)
+
+        if samples >= self._width:
+            # Fold the table into one row per column, then min/max each row
+            per_column = samples // self._width
+            folded = table[: per_column * self._width].reshape(
+                (self._width, per_column)
+            )
+            col_max = np.array(np.max(folded, axis=1), dtype=np.float)
+            col_min = np.array(np.min(folded, axis=1), dtype=np.float)
+            if samples > per_column * self._width:
+                # Remaining samples belong to the last column
+                tail = table[per_column * self._width :]
+                col_max[-1] = max(col_max[-1], np.max(tail))
+                col_min[-1] = min(col_min[-1], np.min(tail))
+        else:
+            # Fewer samples than columns; interpolate between samples
+            col_max = np.interp(
+                np.linspace(0, samples - 1, self._width),
+                np.linspace(0, samples - 1, samples),
+                np.array(table, dtype=np.float),
+            )
+            col_min = col_max
 
         # pylint: disable=nested-min-max
-        # Calculate the y-axis scale factor and adjust y values
-        self._max_sample_value = max(max(y_points), abs(min(y_points)))
+        # Calculate the y-axis scale factor
+        self._max_sample_value = int(max(np.max(col_max), abs(np.min(col_min))))
         if self._max_sample_value != 0:
             if self._auto_scale:
                 self._scale_y = self._height / self._max_sample_value / 2
@@ -226,18 +250,78 @@ class WaveViz(displayio.TileGrid):
                 self._scale_y = self._height / 32767 / 2
         else:
             self._scale_y = 1
-        for y in range(self._width):
-            y_points[y] = self._y_offset - int(y_points[y] * self._scale_y)
 
-        # Draw the values as an open polygon
-        bitmaptools.draw_polygon(
-            self._bmp,
-            x_points,
-            y_points,
-            1,
-            False,
+        top = np.clip(self._y_offset - col_max * self._scale_y, 0, self._height - 1)
+        bottom = np.clip(self._y_offset - col_min * self._scale_y, 0, self._height - 1)
+
+        # Stretch each span to meet its left neighbour so the trace is continuous
+        joined_top = np.array(top)
+        joined_bottom = np.array(bottom)
+        joined_top[1:] = np.minimum(top[1:], bottom[:-1])
+        joined_bottom[1:] = np.maximum(bottom[1:], top[:-1])
+        return (
+            np.array(joined_top, dtype=np.int16),
+            np.array(joined_bottom, dtype=np.int16),
         )
 
+    def _plot_wave(self, spans=None):
+        """Plot the wave_table as a bitmap of vertical spans, one per x-axis
+        column. Y-axis scale factor is determined from the sample values.
+        Spans already returned by ``_wave_spans()`` can be passed in."""
+        self._top, self._bottom = self._wave_spans() if spans is None else spans
+        for x in range(self._width):
+            bitmaptools.fill_region(
+                self._bmp, x, self._top[x], x + 1, self._bottom[x] + 1, 1
+            )
+
+    def _redraw_wave(self):
+        """Replot the wave_table, touching only the bitmap columns whose span
+        changed since the last plot so that displayio refreshes only that
+        region."""
+        top, bottom = self._wave_spans()
+        changed = np.nonzero(abs(top - self._top) + abs(bottom - self._bottom))[0]
+        if len(changed) * 2 > self._width:
+            # Most columns moved; clearing and plotting everything is cheaper
+            self._bmp.fill(0)
+            self._plot_grid()
+            self._plot_wave((top, bottom))
+            return
+
+        i = 0
+        while i < len(changed):
+            # Erase each run of adjacent changed columns with one fill
+            first = int(changed[i])
+            last = first
+            run_top = self._top[first]
+            run_bottom = self._bottom[first]
+            while i + 1 < len(changed) and int(changed[i + 1]) == last + 1:
+                i += 1
+                last += 1
+                run_top = min(run_top, self._top[last])
+                run_bottom = max(run_bottom, self._bottom[last])
+            i += 1
+            bitmaptools.fill_region(self._bmp, first, run_top, last + 1, run_bottom + 1, 0)
+
+            # Restore the grid pixels the erase covered
+            if run_top == 0:
+                bitmaptools.draw_line(self._bmp, first, 0, last, 0, 2)
+            if run_bottom == self._height - 1:
+                bitmaptools.draw_line(
+                    self._bmp, first, self._height - 1, last, self._height - 1, 2
+                )
+            if run_top <= self._y_offset <= run_bottom:
+                bitmaptools.draw_line(
+                    self._bmp, first, self._y_offset, last, self._y_offset, 2
+                )
+            for x in (0, self._width - 1):
+                if first <= x <= last:
+                    bitmaptools.draw_line(self._bmp, x, 0, x, self._height - 1, 2)
+
+            for x in range(first, last + 1):
+                bitmaptools.fill_region(self._bmp, x, top[x], x + 1, bottom[x] + 1, 1)
+        self._top = top
+        self._bottom = bottom
+
     def _plot_grid(self):
         """Plot the grid lines."""
         # Draw the outer box
@@ -0,0 +1,297 @@
+import time
+import asyncio
+
+# USB MIDI clock sync
+#
+# ClockFollower locks the step scheduler to incoming MIDI clock (24 ticks
+# per quarter note). Ticks arrive with USB and host jitter of a millisecond
+# or more, so they are not used as step times directly: a phase locked
+# loop predicts when each tick should have arrived, nudging its phase and
+# period a fraction of the way toward every measured tick, and the
+# scheduler's deadline is set from the prediction.
+#
+# ClockMaster sends clock, start and stop from the scheduler's own step
+# grid. Tick times are computed from a fixed anchor, so rounding never
+# accumulates, and start goes out just before the tick that lines up with
+# step 0.
+#
+# NoteInput plays voices straight from note-on messages, outside the step
+# loop. Notes map to voices through a 128 byte table and velocities to
+# amplitudes through a table of prebuilt floats, so a hit allocates
+# nothing. It can hand clock bytes on to a ClockFollower, since only one
+# reader can own the port.
+#
+# Input is read in batches with readinto() into one preallocated buffer, a
+# short poll at a time, so a flood of MIDI cannot hold up a step.
+
+CLOCK = 0xF8
+START = 0xFA
+CONTINUE = 0xFB
+STOP = 0xFC
+PPQN = 24
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+
+NO_VOICE = 255
+
+# Amplitude for each velocity, built once so hits only pass references
+VELOCITY = tuple(v / 127 for v in range(128))
+
+# Loop gains as shifts: phase takes 1/4 of each error, period 1/32
+PHASE_SHIFT = 2
+PERIOD_SHIFT = 5
+
+# Tick periods outside 20 to 400 BPM are taken as a lost lock
+MIN_TICK_NS = 60_000_000_000 // (400 * PPQN)
+MAX_TICK_NS = 60_000_000_000 // (20 * PPQN)
+
+
+class ClockFollower:
+    """Follows MIDI clock and transport from an input port, driving a
+    scheduler.StepScheduler or TickScheduler through its sync() method.
+    on_start, on_stop and on_continue are called with no arguments as the
+    transport messages arrive."""
+
+    def __init__(self, port, clock, on_start=None, on_stop=None, on_continue=None, buffer=64):
+        self.port = port
+        self.clock = clock
+        self.on_start = on_start
+        self.on_stop = on_stop
+        self.on_continue = on_continue
+        self.buf = bytearray(buffer)
+        self.ticks_per_step = PPQN // clock.steps_per_beat
+
+        self.period = 0      # Estimated ns per tick, 0 until locked
+        self.predicted = 0   # Filtered time of the latest tick
+        self.last = None     # Raw time of the latest tick before lock
+        self.position = -1   # Ticks since start, -1 before the first
+        self.playing = False
+        self.ticks = 0
+        self.relocks = 0
+        self._synced = None  # Deadline last handed to the clock
+
+    @property
+    def bpm(self):
+        if not self.period:
+            return 0
+        return 60_000_000_000 / (self.period * PPQN)
+
+    def poll(self, now=None):
+        """Read what is waiting on the port and act on it. Returns the
+        number of bytes read."""
+        n = self.port.readinto(self.buf)
+        if not n:
+            return 0
+        if now is None:
+            now = time.monotonic_ns()
+        buf = self.buf
+        for i in range(n):
+            self.handle(buf[i], now)
+        return n
+
+    def handle(self, b, now):
+        """Act on one byte read at now. Anything but clock and transport
+        (notes, running status, sysex) is ignored."""
+        if b == CLOCK:
+            self._tick(now)
+        elif b == START:
+            self.position = -1
+            self.playing = True
+            # Hold the first step until the first tick after start
+            self._sync(self.period * self.ticks_per_step or self.clock.period, MAX_TICK_NS * PPQN)
+            if self.on_start is not None:
+                self.on_start()
+        elif b == CONTINUE:
+            self.playing = True
+            if self.on_continue is not None:
+                self.on_continue()
+        elif b == STOP:
+            self.playing = False
+            if self.on_stop is not None:
+                self.on_stop()
+
+    def _tick(self, now):
+        self.ticks += 1
+        if self.playing:
+            self.position += 1
+
+        if not self.period:
+            # Not locked: take the period from the first two ticks
+            if self.last is not None and MIN_TICK_NS <= now - self.last <= MAX_TICK_NS:
+                self.period = now - self.last
+                self.predicted = now
+            self.last = now
+            if self.playing and self.position == 0:
+                # Started before the tempo is known: step 0 plays now
+                self._sync(self.clock.period, 0)
+            return
+
+        self.predicted += self.period
+        error = now - self.predicted
+        if error > self.period * 4 or error < -self.period * 4:
+            # Clock paused or jumped; start over
+            self.period = 0
+            self.last = now
+            self.relocks += 1
+            return
+        self.predicted += error >> PHASE_SHIFT
+        period = self.period + (error >> PERIOD_SHIFT)
+        self.period = min(max(period, MIN_TICK_NS), MAX_TICK_NS)
+
+        if self.playing and self.position >= 0:
+            self._steer(now)
+
+    def _steer(self, now):
+        tps = self.ticks_per_step
+        step_period = self.period * tps
+        if self.position % tps == 0 and self.clock.deadline == self._synced:
+            # This tick is a step boundary the clock has not played yet
+            self._sync(step_period, self.predicted - now)
+        else:
+            ahead = tps - self.position % tps
+            self._sync(step_period, self.predicted + ahead * self.period - now)
+
+    def _sync(self, period_ns, left_ns):
+        self.clock.sync(period_ns, left_ns)
+        self._synced = self.clock.deadline
+
+    async def run(self, poll_ms=1):
+        while True:
+            self.poll()
+            await asyncio.sleep_ms(poll_ms)
+
+
+def note_map(notes):
+    """Note to voice table from a {note: voice index} dict."""
+    table = bytearray([NO_VOICE] * 128)
+    for note, voice in notes.items():
+        table[note] = voice
+    return table
+
+
+class NoteInput:
+    """Plays voices from note-on messages on an input port. voices are
+    callables taking an amplitude (OneShot.play, or a drum's play wrapped
+    to pass its synth); note_map is from note_map(). channel is 0 to 15,
+    or None for all. realtime, if given, is called with each system
+    realtime byte (0xF8 and up) and its time, e.g. ClockFollower.handle."""
+
+    def __init__(self, port, voices, note_map, channel=None, realtime=None, buffer=64):
+        self.port = port
+        self.voices = voices
+        self.note_map = note_map
+        self.channel = channel
+        self.realtime = realtime
+        self.buf = bytearray(buffer)
+        self.hits = 0
+        self._status = 0  # Running status, 0 when none
+        self._data = -1   # First data byte of a two byte message, or -1
+
+    def poll(self, now=None):
+        """Read what is waiting on the port and play any note-ons. Returns
+        the number of bytes read."""
+        n = self.port.readinto(self.buf)
+        if not n:
+            return 0
+        if self.realtime is not None and now is None:
+            now = time.monotonic_ns()
+        buf = self.buf
+        for i in range(n):
+            b = buf[i]
+            if b >= 0xF8:
+                # Realtime bytes may land anywhere, even mid message
+                if self.realtime is not None:
+                    self.realtime(b, now)
+            elif b >= 0xF0:
+                # System common and sysex cancel running status
+                self._status = 0
+                self._data = -1
+            elif b >= 0x80:
+                self._status = b
+                self._data = -1
+            elif self._status:
+                kind = self._status & 0xF0
+                if kind == 0xC0 or kind == 0xD0:
+                    continue  # One data byte, nothing to play
+                if self._data < 0:
+                    self._data = b
+                    continue
+                note = self._data
+                self._data = -1
+                if kind == NOTE_ON and b and (self.channel is None or self._status & 0x0F == self.channel):
+                    voice = self.note_map[note]
+                    if voice != NO_VOICE and voice < len(self.voices):
+                        self.voices[voice](VELOCITY[b])
+                        self.hits += 1
+        return n
+
+    async def run(self, poll_ms=1):
+        while True:
+            self.poll()
+            await asyncio.sleep_ms(poll_ms)
+
+
+class ClockMaster:
+    """Sends MIDI clock from a scheduler's step grid on an output port,
+    plus start and stop."""
+
+    def __init__(self, port, clock):
+        self.port = port
+        self.clock = clock
+        self.ticks_per_step = PPQN // clock.steps_per_beat
+        self._clock_msg = bytes((CLOCK,))
+        self._start_msg = bytes((START,))
+        self._stop_msg = bytes((STOP,))
+        self._start_pending = False
+        self.playing = False
+        self.sent = 0
+        self.late_max = 0  # Latest tick, ns after its time
+        self._anchor = 0
+        self._k = 0
+        self._period = 0
+        self.deadline = 0
+
+    def _anchor_to(self, deadline):
+        self._anchor = deadline
+        self._k = 0
+        self._period = self.clock.period
+        self.deadline = deadline
+
+    def start(self):
+        """Send start just before the tick that lines up with the clock's
+        next step, which is where step 0 plays."""
+        self._anchor_to(self._next_step())
+        self._start_pending = True
+        self.playing = True
+
+    def stop(self):
+        self._start_pending = False
+        self.playing = False
+        self.port.write(self._stop_msg)
+
+    def _next_step(self):
+        # Works for either scheduler: time_left() is in ns for both
+        return time.monotonic_ns() + self.clock.time_left()
+
+    async def run(self):
+        self._anchor_to(self._next_step())
+        while True:
+            left = self.deadline - time.monotonic_ns()
+            if left > 0:
+                # The anchor may move while asleep, so look again on waking
+                await asyncio.sleep_ms(left // 1_000_000)
+                continue
+
+            if -left > self.late_max:
+                self.late_max = -left
+            if self._start_pending:
+                self._start_pending = False
+                self.port.write(self._start_msg)
+            self.port.write(self._clock_msg)
+            self.sent += 1
+
+            if self.clock.period != self._period:
+                # Tempo changed: carry on from this tick at the new spacing
+                self._anchor_to(self.deadline)
+            self._k += 1
+            self.deadline = self._anchor + self._k * self._period // self.ticks_per_step
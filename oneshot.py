@@ -0,0 +1,224 @@
+import math
+import ulab.numpy as np
+from ulab.scipy.signal import sosfilt
+import audiocore
+
+# Pre-rendered drum one-shots
+#
+# Renders a drum voice (drums.KickDrum, Snare, HighHat or anything with the
+# same notes()/filter_mode/filter_fr shape) once into an int16 buffer that
+# follows the synthio rules: wave table playback, bend from a one-shot LFO,
+# linear attack/decay envelope and an RBJ biquad filter. The result plays
+# on an audiomixer voice as an audiocore.RawSample, so no Synthesizer has
+# to run while the sequencer is playing.
+
+TAIL = 0.005  # Seconds rendered after the longest envelope for filter ring-out
+
+
+def _biquad(mode, frequency, sample_rate, q=0.7071):
+    # Same cookbook coefficients synthio uses, as one scipy style sos row
+    w0 = 2 * math.pi * min(frequency, sample_rate * 0.49) / sample_rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2 * q)
+    if mode == "hpf":
+        b0 = (1 + cos_w0) / 2
+        b1 = -(1 + cos_w0)
+    else:
+        b0 = (1 - cos_w0) / 2
+        b1 = 1 - cos_w0
+    a0 = 1 + alpha
+    return np.array([[b0 / a0, b1 / a0, b0 / a0, 1.0, -2 * cos_w0 / a0, (1 - alpha) / a0]])
+
+
+def _cycles(note, t, sample_rate):
+    """Oscillator phase in cycles at each time in t, following note.bend."""
+    f0 = note.frequency
+    lfo = note.bend
+    if lfo is None or not lfo.once:
+        # Free running or no bend: render at the centre pitch
+        bend = 0 if lfo is None else lfo.offset
+        return t * (f0 * 2 ** bend)
+
+    # A one-shot LFO runs through its table once, linearly interpolated
+    # over len - 1 segments, then holds the last value
+    wave = lfo.waveform
+    segs = len(wave) - 1
+    seg_time = 1 / (lfo.rate * segs)
+    ln2 = math.log(2)
+    n = len(t)
+    cycles = np.zeros(n)
+    acc = 0.0
+    b0 = lfo.offset + lfo.scale * wave[0] / 32767
+    for seg in range(segs):
+        b1 = lfo.offset + lfo.scale * wave[seg + 1] / 32767
+        k = (b1 - b0) / seg_time
+        t0 = seg * seg_time
+        i0 = min(int(t0 * sample_rate + 0.5), n)
+        i1 = min(int((t0 + seg_time) * sample_rate + 0.5), n)
+        if i1 > i0:
+            tt = t[i0:i1] - t0
+            if k:
+                cycles[i0:i1] = acc + f0 * (np.exp((b0 + k * tt) * ln2) - 2 ** b0) / (k * ln2)
+            else:
+                cycles[i0:i1] = acc + f0 * 2 ** b0 * tt
+        if k:
+            acc += f0 * (2 ** b1 - 2 ** b0) / (k * ln2)
+        else:
+            acc += f0 * 2 ** b0 * seg_time
+        b0 = b1
+
+    i_end = min(int(segs * seg_time * sample_rate + 0.5), n)
+    if i_end < n:
+        cycles[i_end:] = acc + f0 * 2 ** b0 * (t[i_end:] - segs * seg_time)
+    return cycles
+
+
+def _render_note(note, t, sample_rate):
+    table = note.waveform
+    size = len(table)
+    # Table with the first sample repeated at the end so interp wraps cleanly
+    fp = np.zeros(size + 1)
+    fp[:size] = np.array(table, dtype=np.float)
+    fp[size] = fp[0]
+    xp = np.linspace(0, size, size + 1)
+
+    pos = _cycles(note, t, sample_rate) * size
+    pos = pos - np.floor(pos / size) * size
+    out = np.interp(pos, xp, fp)
+
+    env = note.envelope
+    level = env.attack_level * note.amplitude
+    if env.decay_time > 0:
+        ramp = np.clip(1 - t / env.decay_time, 0, 1)
+        out = out * (env.sustain_level + (1 - env.sustain_level) * ramp) * level
+    else:
+        out = out * env.sustain_level * level
+    return out
+
+
+def length(voice, sample_rate):
+    """Number of samples a rendered one-shot of voice will hold."""
+    longest = 0
+    for note in voice.notes():
+        longest = max(longest, note.envelope.attack_time + note.envelope.decay_time)
+    return max(int((longest + TAIL) * sample_rate), 1)
+
+
+def render(voice, sample_rate):
+    """Render one hit of voice. Returns an int16 ulab array."""
+    n = length(voice, sample_rate)
+    t = np.linspace(0, (n - 1) / sample_rate, n)
+    mix = np.zeros(n)
+    for note in voice.notes():
+        mix = mix + _render_note(note, t, sample_rate)
+
+    # Every note of a voice shares one filter, and the filter is linear,
+    # so filtering the sum matches filtering each note
+    mix = sosfilt(_biquad(voice.filter_mode, voice.filter_fr, sample_rate), mix)
+    return np.array(np.clip(mix, -32767, 32767), dtype=np.int16)
+
+
+def sample(voice, sample_rate):
+    return audiocore.RawSample(render(voice, sample_rate), channel_count=1, sample_rate=sample_rate)
+
+
+def key(voice):
+    """Cache key for a voice's rendered sound. Parameters are quantized
+    (1 ms decay, 1/24 octave filter steps) so knob jitter does not miss."""
+    parts = [voice.filter_mode, int(round(math.log(max(voice.filter_fr, 1)) / math.log(2) * 24))]
+    for note in voice.notes():
+        parts.append(id(note.waveform))
+        parts.append(int(note.frequency * 10))
+        parts.append(int(note.envelope.decay_time * 1000 + 0.5))
+        parts.append(int(note.amplitude * 100 + 0.5))
+    return tuple(parts)
+
+
+class RenderCache:
+    """Rendered one-shots keyed by voice parameters, with LRU eviction
+    once the stored buffers exceed budget bytes."""
+
+    def __init__(self, budget=40 * 1024):
+        self.budget = budget
+        self.used = 0
+        self._samples = {}
+        self._sizes = {}
+        self._order = []  # Least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, voice, sample_rate):
+        """Returns (RawSample, int16 buffer) for voice."""
+        k = (key(voice), sample_rate)
+        if k in self._samples:
+            self.hits += 1
+            self._order.remove(k)
+            self._order.append(k)
+            return self._samples[k]
+
+        self.misses += 1
+        buf = render(voice, sample_rate)
+        size = len(buf) * 2
+        while self._order and self.used + size > self.budget:
+            old = self._order.pop(0)
+            self.used -= self._sizes.pop(old)
+            del self._samples[old]
+            self.evictions += 1
+
+        entry = (audiocore.RawSample(buf, channel_count=1, sample_rate=sample_rate), buf)
+        if size <= self.budget:
+            self._samples[k] = entry
+            self._sizes[k] = size
+            self._order.append(k)
+            self.used += size
+        return entry
+
+    def clear(self):
+        self._samples = {}
+        self._sizes = {}
+        self._order = []
+        self.used = 0
+
+    def stats(self):
+        return "render cache: {} hits, {} misses, {} evicted, {}/{} bytes in {} entries".format(
+            self.hits, self.misses, self.evictions, self.used, self.budget, len(self._order))
+
+
+class OneShot:
+    """Plays a pre-rendered voice on one audiomixer voice."""
+
+    def __init__(self, mixer_voice, voice, sample_rate, cache=None, tap=None, track=0):
+        self.mixer_voice = mixer_voice
+        self.voice = voice
+        self.sample_rate = sample_rate
+        self.cache = cache
+        # Optional scope.AudioTap told about every hit, as track
+        self.tap = tap
+        self.track = track
+        # Mixer level at full velocity, and the velocity scale of the last hit
+        self.volume = mixer_voice.level
+        self.amplitude = 1.0
+        self.rerender()
+
+    def rerender(self):
+        """Render again after a voice parameter changed (setTime, setLPF,
+        setHPF). Settings seen before come straight from the cache."""
+        if self.cache is None:
+            self.buffer = render(self.voice, self.sample_rate)
+            self.sample = audiocore.RawSample(self.buffer, channel_count=1, sample_rate=self.sample_rate)
+        else:
+            self.sample, self.buffer = self.cache.get(self.voice, self.sample_rate)
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self.mixer_voice.level = volume * self.amplitude
+
+    def play(self, amplitude=1.0):
+        # The rendered sound is fixed, so velocity scales the mixer voice
+        if amplitude != self.amplitude:
+            self.amplitude = amplitude
+            self.mixer_voice.level = self.volume * amplitude
+        self.mixer_voice.play(self.sample)
+        if self.tap is not None:
+            self.tap.trigger(self.track, self.buffer, self.mixer_voice.level)
@@ -0,0 +1,61 @@
+from array import array
+
+# Bit-packed pattern store
+#
+# Each track is a bitmask of its steps. CircuitPython small ints are only
+# 31 bits wide and anything larger is a heap allocated long int, so a
+# track's mask is split into 16-bit words (16 steps each) to keep every
+# lookup allocation free. A second array holds, per step, the mask of the
+# tracks that hit on that step; that is all seq_Step() needs to read.
+
+MAX_TRACKS = 16
+MAX_STEPS = 64
+
+
+class Pattern:
+    def __init__(self, tracks, steps):
+        if tracks > MAX_TRACKS or steps > MAX_STEPS:
+            raise ValueError("Pattern is limited to 16 tracks and 64 steps")
+        self.tracks = tracks
+        self.steps = steps
+        self.words = (steps + 15) // 16
+        self.rows = array("H", [0] * (tracks * self.words))
+        self.cols = array("H", [0] * steps)
+
+    def get(self, track, step):
+        return (self.rows[track * self.words + (step >> 4)] >> (step & 15)) & 1
+
+    def set(self, track, step, on):
+        i = track * self.words + (step >> 4)
+        if on:
+            self.rows[i] |= 1 << (step & 15)
+            self.cols[step] |= 1 << track
+        else:
+            self.rows[i] &= ~(1 << (step & 15)) & 0xFFFF
+            self.cols[step] &= ~(1 << track) & 0xFFFF
+
+    def toggle(self, track, step):
+        on = 1 - self.get(track, step)
+        self.set(track, step, on)
+        return on
+
+    def column(self, step):
+        """Mask of the tracks that hit on step (bit n = track n)."""
+        return self.cols[step]
+
+    def clear(self):
+        for i in range(len(self.rows)):
+            self.rows[i] = 0
+        for i in range(self.steps):
+            self.cols[i] = 0
+
+    def load(self, rows):
+        """Fill the pattern from a list of lists, rows[track][step]."""
+        self.clear()
+        for track in range(min(len(rows), self.tracks)):
+            for step in range(min(len(rows[track]), self.steps)):
+                if rows[track][step]:
+                    self.set(track, step, 1)
+
+    def to_lists(self):
+        return [[self.get(t, s) for s in range(self.steps)] for t in range(self.tracks)]
@@ -0,0 +1,117 @@
+import gc
+import time
+import struct
+import binascii
+from array import array
+
+# Hot path profiler
+#
+# Profiler.wrap() returns a stand-in for a function that records, per call,
+# how long it took, how late it started after the deadline of the step played last
+# and how many bytes gc.mem_free() says it used, into fixed arrays. Nothing
+# is wrapped unless profiling is turned on, so when it is off the original
+# functions run untouched and there is nothing to pay for.
+#
+# dump() prints the ring as one "PRF:" line of base64 over serial; run
+# hostsim/profdecode.py on the captured output to get histograms.
+#
+# Frame layout (little endian):
+#   header  "<4sBH"   magic b"PRF1", number of names, number of records
+#   names   per name, a length byte and the ASCII name
+#   records "<BIii"   name id, duration us, lateness us, bytes allocated
+# Records are oldest first.
+
+MAGIC = b"PRF1"
+HEADER = "<4sBH"
+RECORD = "<BIii"
+PREFIX = "PRF:"
+
+
+class Profiler:
+    def __init__(self, clock=None, size=256):
+        # clock is the StepScheduler (or TickScheduler) whose deadlines
+        # lateness is measured against; without one it is recorded as 0
+        self.clock = clock
+        self.size = size
+        self.names = []
+        self.ids = bytearray(size)
+        self.durations = array("L", [0] * size)  # us
+        self.lateness = array("l", [0] * size)   # us after the step deadline
+        self.allocated = array("l", [0] * size)  # bytes, negative if a gc ran
+        self.count = 0
+
+    def _id(self, name):
+        if name not in self.names:
+            if len(self.names) == 255:
+                raise ValueError("Profiler is limited to 255 names")
+            self.names.append(name)
+        return self.names.index(name)
+
+    def _record(self, hook, start, mem):
+        end = time.monotonic_ns()
+        i = self.count % self.size
+        self.ids[i] = hook
+        self.durations[i] = (end - start) // 1000
+        clock = self.clock
+        if clock is not None:
+            # Against the deadline of the step played last, which sync()
+            # and dropped steps leave alone. since_step() is in ns for both
+            # schedulers; on ticks it is whole ms, so a call that started
+            # in the deadline's own ms can come out below 0
+            late = (clock.since_step() - (end - start)) // 1000
+            self.lateness[i] = late if late > 0 else 0
+        self.allocated[i] = mem - gc.mem_free()
+        self.count += 1
+
+    def wrap(self, name, func, nargs=0):
+        """func wrapped to record each call under name. nargs is the
+        number of positional arguments it takes (0 to 2); a fixed
+        signature avoids building an argument tuple per call."""
+        hook = self._id(name)
+        record = self._record
+
+        if nargs == 0:
+            def wrapper():
+                mem = gc.mem_free()
+                start = time.monotonic_ns()
+                result = func()
+                record(hook, start, mem)
+                return result
+        elif nargs == 1:
+            def wrapper(a):
+                mem = gc.mem_free()
+                start = time.monotonic_ns()
+                result = func(a)
+                record(hook, start, mem)
+                return result
+        elif nargs == 2:
+            def wrapper(a, b):
+                mem = gc.mem_free()
+                start = time.monotonic_ns()
+                result = func(a, b)
+                record(hook, start, mem)
+                return result
+        else:
+            raise ValueError("nargs must be 0, 1 or 2")
+        return wrapper
+
+    def clear(self):
+        self.count = 0
+
+    def frame(self):
+        """The ring as a binary frame, oldest record first."""
+        n = min(self.count, self.size)
+        first = self.count - n
+        parts = [struct.pack(HEADER, MAGIC, len(self.names), n)]
+        for name in self.names:
+            raw = name.encode()
+            parts.append(bytes((len(raw),)) + raw)
+        for k in range(first, first + n):
+            i = k % self.size
+            parts.append(struct.pack(RECORD, self.ids[i], self.durations[i],
+                                     self.lateness[i], self.allocated[i]))
+        return b"".join(parts)
+
+    def dump(self):
+        """Print the ring over serial as one base64 line."""
+        print(PREFIX + binascii.b2a_base64(self.frame()).decode().strip())
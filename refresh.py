@@ -0,0 +1,152 @@
+import time
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# Frame budgeted display refresh
+#
+# With auto_refresh on, displayio pushes a frame whenever it likes, which
+# can land right on a step. Here the display only refreshes when something
+# marked it dirty, at most max_fps times a second, and only when the time
+# left before the next step is longer than a refresh is expected to take.
+#
+# With ticks=True it times itself with millisecond ticks instead of
+# time.monotonic_ns(), whose long int results are heap allocated; costs
+# are still kept in ns, to millisecond resolution.
+
+GRID = 1
+PLAYHEAD = 2
+METERS = 4
+SCOPE = 8
+
+
+def _sub(a, b):
+    return a - b
+
+
+def _bit(flag):
+    bit = 0
+    while flag > 1:
+        flag >>= 1
+        bit += 1
+    return bit
+
+
+class CostEstimate:
+    """Running estimate, in ns, of how long a deferrable job (a refresh, a
+    scope frame) takes, and whether it fits in the slack left.
+
+    It rises at once on a slow run and decays slowly after. It also decays
+    each time the job is deferred: the estimate only moves when the job
+    runs, so otherwise one slow run (the first full screen draw) could
+    keep every later one deferred for good."""
+
+    def __init__(self, margin_ns=2_000_000):
+        self.margin_ns = margin_ns
+        self.ns = 0
+
+    def fits(self, slack_ns):
+        if slack_ns >= self.ns + self.margin_ns:
+            return True
+        self.ns = self.ns * 7 // 8
+        return False
+
+    def add(self, cost_ns):
+        self.ns = cost_ns if cost_ns > self.ns else (self.ns * 7 + cost_ns) // 8
+
+
+class Refresher:
+    def __init__(self, display, max_fps=20, margin_ns=2_000_000, log=None, log_every=64, ticks=False):
+        self.display = display
+        display.auto_refresh = False
+        if ticks:
+            self._now = ticks_ms
+            self._diff = ticks_diff
+            self._unit_ns = 1_000_000
+        else:
+            self._now = time.monotonic_ns
+            self._diff = _sub
+            self._unit_ns = 1
+        # Minimum time between frames, in the clock's units
+        self.frame = 1_000_000_000 // max_fps // self._unit_ns
+        self.cost = CostEstimate(margin_ns)  # Of one refresh
+        self.log = log
+        self.log_every = log_every
+        self.stalls = None    # A latency.StallMonitor to report refreshes to
+
+        self.dirty = 0
+        self.last_ns = 0      # Duration of the latest refresh
+        self.max_ns = 0
+        self.total_us = 0
+        self.count = 0
+        self.deferred = 0     # Refreshes held back for lack of slack
+        # Slowest refresh seen with each flag dirty, by flag bit number
+        self.flag_max_ns = [0, 0, 0, 0]
+        # Frames in which each flag was the only one dirty: slowest, count
+        # and total, which is what that kind of change alone costs
+        self.alone_max_ns = [0, 0, 0, 0]
+        self.alone_count = [0, 0, 0, 0]
+        self.alone_total_us = [0, 0, 0, 0]
+        # A frame ago, so the first update may refresh. Not 0: ticks start
+        # about 65 s before they wrap, which ticks_diff() sees as the future
+        self._last = self._now() - self.frame
+
+    def mark(self, flags):
+        self.dirty |= flags
+
+    def update(self, slack_ns, now=None):
+        """Refresh if anything is dirty, the frame cap allows it and the
+        slack before the next step covers a refresh. Returns True if the
+        display was refreshed. now is in the clock's units (ns, or ms
+        ticks with ticks=True)."""
+        if not self.dirty:
+            return False
+        if now is None:
+            now = self._now()
+        if self._diff(now, self._last) < self.frame:
+            return False
+        if not self.cost.fits(slack_ns):
+            self.deferred += 1
+            return False
+
+        self.display.refresh()
+        cost = self._diff(self._now(), now) * self._unit_ns
+
+        for bit in range(len(self.flag_max_ns)):
+            if self.dirty & (1 << bit) and cost > self.flag_max_ns[bit]:
+                self.flag_max_ns[bit] = cost
+        if self.dirty & (self.dirty - 1) == 0:
+            bit = _bit(self.dirty)
+            self.alone_count[bit] += 1
+            self.alone_total_us[bit] += cost // 1000
+            if cost > self.alone_max_ns[bit]:
+                self.alone_max_ns[bit] = cost
+        self.dirty = 0
+        self._last = now
+        self.last_ns = cost
+        self.total_us += cost // 1000
+        self.count += 1
+        if cost > self.max_ns:
+            self.max_ns = cost
+        self.cost.add(cost)
+        if self.stalls is not None:
+            self.stalls.check(cost // 1_000_000, "refresh")
+
+        if self.log is not None and self.count % self.log_every == 0:
+            self.log(self.stats())
+        return True
+
+    def worst(self, flag):
+        """Slowest refresh, in ns, of a frame in which flag was dirty."""
+        return self.flag_max_ns[_bit(flag)]
+
+    def worst_alone(self, flag):
+        """Slowest refresh, in ns, of a frame in which only flag was dirty."""
+        return self.alone_max_ns[_bit(flag)]
+
+    def mean_alone_us(self, flag):
+        bit = _bit(flag)
+        return self.alone_total_us[bit] // max(self.alone_count[bit], 1)
+
+    def stats(self):
+        mean_us = self.total_us // max(self.count, 1)
+        return "refresh: {} frames, last {} us, mean {} us, max {} us, {} deferred".format(
+            self.count, self.last_ns // 1000, mean_us, self.max_ns // 1000, self.deferred)
@@ -0,0 +1,275 @@
+import gc
+import time
+import asyncio
+from array import array
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+# Step scheduler
+#
+# Steps are timed from absolute time.monotonic_ns() deadlines instead of
+# sleeping a fixed delay after each step, so time spent on input, UI or GC
+# does not accumulate into the tempo.
+
+CATCH_UP = 0  # Play missed steps late, in a burst (up to max_catchup)
+DROP = 1      # Skip missed steps and stay locked to the grid
+
+
+class StepScheduler:
+    def __init__(self, bpm, steps_per_beat=1, policy=DROP, max_catchup=2, history=64):
+        self.policy = policy
+        self.max_catchup = max_catchup
+        self.steps_per_beat = steps_per_beat
+        self.set_bpm(bpm)
+
+        # Lateness of each step in microseconds, kept in a fixed ring
+        self.lateness = array("l", [0] * history)
+        self.count = 0
+        self.late_max = 0
+        self.skipped = 0        # Steps dropped by the last wait()
+        self.total_skipped = 0
+
+        self.deadline = 0
+        # Deadline of the step played last, as the lateness in _record()
+        # is measured from: where a profiler measures its calls from
+        self.last_deadline = 0
+        # Longest single sleep in ns, or None. With an external clock
+        # moving the deadline (midi.ClockFollower) a cap bounds how long a
+        # moved deadline goes unnoticed; wait() then returns 0 when early.
+        self.max_sleep_ns = None
+
+    def set_bpm(self, bpm):
+        self.bpm = bpm
+        self.period = int(60_000_000_000 / (bpm * self.steps_per_beat))
+
+    def sync(self, period_ns, left_ns, now=None):
+        """Follow an external clock: steps are now period_ns apart and the
+        next one is due left_ns from now."""
+        if now is None:
+            now = time.monotonic_ns()
+        self.period = period_ns
+        self.bpm = 60_000_000_000 / (period_ns * self.steps_per_beat)
+        self.deadline = now + left_ns
+
+    def start(self, now=None):
+        if now is None:
+            now = time.monotonic_ns()
+        self.deadline = now
+        self.last_deadline = now
+
+    def time_left(self, now=None):
+        """Nanoseconds until the next step is due (negative when late)."""
+        if now is None:
+            now = time.monotonic_ns()
+        return self.deadline - now
+
+    def since_step(self, now=None):
+        """Nanoseconds since the deadline of the step played last."""
+        if now is None:
+            now = time.monotonic_ns()
+        return now - self.last_deadline
+
+    async def wait(self):
+        """Sleep until the next step deadline. Returns the number of steps
+        to play now; self.skipped holds steps dropped under the DROP policy."""
+        now = time.monotonic_ns()
+        left = self.deadline - now
+        if left > 0:
+            if self.max_sleep_ns is not None and left > self.max_sleep_ns:
+                left = self.max_sleep_ns
+            await asyncio.sleep(left / 1_000_000_000)
+            now = time.monotonic_ns()
+        else:
+            # Still yield so other tasks get a turn
+            await asyncio.sleep(0)
+
+        late = now - self.deadline
+        if late < 0:
+            # Woke at the sleep cap, or the deadline was moved later
+            self.skipped = 0
+            return 0
+        self._record(late // 1000)
+        self.last_deadline = self.deadline
+        due = self._due(late // self.period)
+        self.deadline += (due + self.skipped) * self.period
+        return due
+
+    def _due(self, missed):
+        """Apply the policy to the number of whole periods missed. Returns
+        the steps to play now and sets self.skipped."""
+        due = 1 + missed  # Steps whose deadline has passed, including this one
+        self.skipped = 0
+        if due > 1:
+            if self.policy == CATCH_UP and due <= self.max_catchup:
+                pass
+            elif self.policy == CATCH_UP:
+                self.skipped = due - self.max_catchup
+                due = self.max_catchup
+            else:
+                self.skipped = due - 1
+                due = 1
+            self.total_skipped += self.skipped
+        return due
+
+    def _record(self, late_us):
+        self.lateness[self.count % len(self.lateness)] = late_us
+        self.count += 1
+        if late_us > self.late_max:
+            self.late_max = late_us
+
+    def stats(self):
+        """Returns (steps, mean lateness us, max lateness us, skipped steps)
+        over the lateness history."""
+        n = min(self.count, len(self.lateness))
+        if n == 0:
+            return (0, 0, 0, 0)
+        total = 0
+        for i in range(n):
+            total += self.lateness[i]
+        return (self.count, total // n, self.late_max, self.total_skipped)
+
+
+class TickScheduler(StepScheduler):
+    """StepScheduler on the millisecond ticks of adafruit_ticks, for the
+    allocation free loop. time.monotonic_ns() values are long ints that
+    are heap allocated; ticks stay small ints, and the fraction of a
+    millisecond in the period is carried separately so the tempo does not
+    drift. time_left() and period are still in ns (small ints while a
+    step is shorter than a second), as is since_step(), while
+    last_deadline is in ticks.
+
+    Use sleep_ms() and advance() rather than wait(): awaiting a call to
+    wait() creates a coroutine every step, while asyncio.sleep_ms() hands
+    back a shared generator."""
+
+    def set_bpm(self, bpm):
+        self.bpm = bpm
+        self.period_us = 60_000_000 // (bpm * self.steps_per_beat)
+        self.period = self.period_us * 1000
+        self._frac_us = 0
+
+    def start(self, now=None):
+        self.deadline = ticks_ms() if now is None else now
+        self.last_deadline = self.deadline
+        self._frac_us = 0
+
+    def sync(self, period_ns, left_ns, now=None):
+        if now is None:
+            now = ticks_ms()
+        self.period_us = period_ns // 1000
+        self.period = self.period_us * 1000
+        self.bpm = 60_000_000_000 / (period_ns * self.steps_per_beat)
+        self.deadline = ticks_add(now, left_ns // 1_000_000)
+        self._frac_us = 0
+
+    def time_left(self, now=None):
+        if now is None:
+            now = ticks_ms()
+        return ticks_diff(self.deadline, now) * 1_000_000
+
+    def since_step(self, now=None):
+        if now is None:
+            now = ticks_ms()
+        return ticks_diff(now, self.last_deadline) * 1_000_000
+
+    def sleep_ms(self):
+        """Milliseconds until the next step deadline, 0 when late."""
+        left = ticks_diff(self.deadline, ticks_ms())
+        if self.max_sleep_ns is not None and left > self.max_sleep_ns // 1_000_000:
+            return self.max_sleep_ns // 1_000_000
+        return max(left, 0)
+
+    def advance(self, now=None):
+        """Call once the deadline has been reached. Returns the number of
+        steps to play now, as wait() does."""
+        if now is None:
+            now = ticks_ms()
+        late_us = ticks_diff(now, self.deadline) * 1000
+        if late_us < 0:
+            self.skipped = 0
+            return 0
+        self._record(late_us)
+        self.last_deadline = self.deadline
+        due = self._due(late_us // self.period_us)
+        for _ in range(due + self.skipped):
+            self._frac_us += self.period_us
+            self.deadline = ticks_add(self.deadline, self._frac_us // 1000)
+            self._frac_us %= 1000
+        return due
+
+    async def wait(self):
+        await asyncio.sleep_ms(self.sleep_ms())
+        return self.advance()
+
+
+class Collector:
+    """Scheduled garbage collection for the allocation free loop.
+
+    Automatic collection is turned off; once a bar, gc.collect() runs after
+    the step that had the most slack in the previous bar, if that slack
+    still covers a collection. gc.mem_alloc() is read from waking to going
+    back to sleep, begin() to end(), so any allocation that creeps back
+    into the loop shows up in allocated and dirty_loops. Tasks that run
+    while the loop sleeps (the MIDI tasks, the scope) are not counted."""
+
+    def __init__(self, steps, margin_ms=2):
+        self.slack_us = array("l", [0] * steps)
+        self.step = steps - 1  # Step to collect after this bar
+        self.margin_ms = margin_ms
+        self.cost_ms = 0       # Longest collection seen
+        self.collections = 0
+        self.deferred = 0      # Bars where the slack was too short
+        self.allocated = 0     # Bytes allocated inside the loop, in total
+        self.dirty_loops = 0   # Loop passes that allocated anything
+        self.loops = 0
+        self._mark = 0
+        self._used = 0
+        self.stalls = None     # A latency.StallMonitor to report collections to
+        gc.disable()
+
+    def begin(self):
+        """Start counting, on waking or after a pause()."""
+        self._mark = gc.mem_alloc()
+
+    def pause(self):
+        """Stop counting until the next begin(), for work that is allowed
+        to allocate."""
+        self._used += gc.mem_alloc() - self._mark
+
+    def end(self, step, slack_ns):
+        """Close the pass, before going back to sleep. If it played step
+        (-1 if none) with slack_ns left before the next one, collect if
+        this is the step picked for the bar."""
+        used = self._used + gc.mem_alloc() - self._mark
+        self._used = 0
+        self.loops += 1
+        if used > 0:
+            self.allocated += used
+            self.dirty_loops += 1
+        if step < 0:
+            return
+
+        self.slack_us[step] = slack_ns // 1000
+        if step == self.step:
+            if slack_ns // 1_000_000 > self.cost_ms + self.margin_ms:
+                start = ticks_ms()
+                gc.collect()
+                cost = ticks_diff(ticks_ms(), start)
+                if cost > self.cost_ms:
+                    self.cost_ms = cost
+                if self.stalls is not None:
+                    self.stalls.check(cost, "gc")
+                self.collections += 1
+            else:
+                self.deferred += 1
+
+        if step == len(self.slack_us) - 1:
+            # Pick next bar's step: the one with the most slack in this one
+            best = 0
+            for i in range(len(self.slack_us)):
+                if self.slack_us[i] > self.slack_us[best]:
+                    best = i
+            self.step = best
+
+    def stats(self):
+        return "gc: {} collections, max {} ms, {} deferred, {} bytes in {} of {} loops".format(
+            self.collections, self.cost_ms, self.deferred, self.allocated, self.dirty_loops, self.loops)
@@ -0,0 +1,178 @@
+import time
+import math
+import asyncio
+import ulab.numpy as np
+import displayio
+import bitmaptools
+from cedargrove_waveviz import WaveViz
+from refresh import CostEstimate
+
+# Live scope and level meters
+#
+# CircuitPython gives no way to read back what the mixer is playing, but in
+# one-shot mode every sound is a known buffer started at a known time.
+# AudioTap rebuilds the block of output that is reaching the speaker from
+# those buffers: it trails the hits by the mixer's buffering, and by at
+# least a block, so a hit shows as a whole block of sound rather than its
+# first sample. ScopeMonitor draws it from its own task at a capped frame
+# rate, only when there is slack before the next sequencer step.
+
+
+class AudioTap:
+    def __init__(self, voices, sample_rate, block=240, delay_ns=0):
+        self.sample_rate = sample_rate
+        self.block = block
+        # How far the rendered block trails the hits
+        self.delay_ns = max(delay_ns, block * 1_000_000_000 // sample_rate)
+        self.samples = np.zeros(block, dtype=np.int16)
+
+        self._buffers = [None] * voices
+        self._starts = [0] * voices
+        self._levels = [0.0] * voices
+
+        # Latest per-voice levels, 0.0 to 1.0 of full scale
+        self.peak = [0.0] * voices
+        self.rms = [0.0] * voices
+
+    def trigger(self, voice, buffer, level, now=None):
+        """Note that buffer started playing on voice at level."""
+        if now is None:
+            now = time.monotonic_ns()
+        self._buffers[voice] = buffer
+        self._starts[voice] = now
+        self._levels[voice] = level
+
+    def render(self, now=None):
+        """Rebuild the block of output heard at now, the one that ends
+        delay_ns before it, and update the meters. Returns the block."""
+        if now is None:
+            now = time.monotonic_ns()
+        now -= self.delay_ns
+        block = self.block
+        mix = np.zeros(block)
+        for v in range(len(self._buffers)):
+            buf = self._buffers[v]
+            self.peak[v] = 0.0
+            self.rms[v] = 0.0
+            if buf is None:
+                continue
+            end = (now - self._starts[v]) * self.sample_rate // 1_000_000_000
+            if end - block >= len(buf):
+                self._buffers[v] = None  # Finished playing
+                continue
+            lo = max(end - block, 0)
+            hi = min(end, len(buf))
+            if hi <= lo:
+                continue
+            part = np.array(buf[lo:hi], dtype=np.float) * self._levels[v]
+            at = lo - (end - block)
+            mix[at:at + hi - lo] = mix[at:at + hi - lo] + part
+            self.peak[v] = np.max(abs(part)) / 32767
+            self.rms[v] = math.sqrt(np.mean(part * part)) / 32767
+
+        self.samples[:] = np.array(np.clip(mix, -32767, 32767), dtype=np.int16)
+        return self.samples
+
+    def latest(self):
+        return self.samples
+
+
+class ScopeView(WaveViz):
+    """WaveViz plot of the tap's latest block at a fixed scale, so the
+    trace height follows the actual output level."""
+
+    def __init__(self, tap, x, y, width, height, plot_color=0x00FF00, grid_color=0x404040):
+        self.tap = tap
+        super().__init__(tap.latest(), x, y, width, height,
+                         plot_color=plot_color, grid_color=grid_color, auto_scale=False)
+
+    def update(self):
+        self.wave_table = self.tap.latest()
+
+
+class LevelMeters(displayio.TileGrid):
+    """One vertical bar per voice: RMS as a filled bar, peak as a line."""
+
+    def __init__(self, voices, x, y, width, height, rms_color=0x00FF00, peak_color=0xFFFF00):
+        self.voices = voices
+        self.height_px = height
+        self.bar_w = max(width // voices, 2)
+        self.palette = displayio.Palette(3)
+        self.palette[0] = 0x000000
+        self.palette[1] = rms_color
+        self.palette[2] = peak_color
+        self.bmp = displayio.Bitmap(self.bar_w * voices, height, 3)
+        self._rms_px = [0] * voices
+        self._peak_px = [0] * voices
+        super().__init__(self.bmp, pixel_shader=self.palette, x=x, y=y)
+
+    def show(self, peaks, rmss):
+        h = self.height_px
+        for v in range(self.voices):
+            rms_px = min(int(rmss[v] * h), h)
+            peak_px = min(int(peaks[v] * h), h)
+            if rms_px == self._rms_px[v] and peak_px == self._peak_px[v]:
+                continue  # Unchanged bars cost nothing to refresh
+            x0 = v * self.bar_w
+            x1 = x0 + self.bar_w - 1  # Leave a gap column between bars
+            bitmaptools.fill_region(self.bmp, x0, 0, x1, h, 0)
+            if rms_px:
+                bitmaptools.fill_region(self.bmp, x0, h - rms_px, x1, h, 1)
+            if peak_px:
+                bitmaptools.fill_region(self.bmp, x0, h - peak_px, x1, h - peak_px + 1, 2)
+            self._rms_px[v] = rms_px
+            self._peak_px[v] = peak_px
+
+
+class ScopeMonitor:
+    """Updates the scope and meters at most fps times a second, and only
+    when the caller reports more slack than a frame is expected to take.
+    run() does this from its own task, between sequencer steps."""
+
+    def __init__(self, tap, view=None, meters=None, fps=15, margin_ns=2_000_000):
+        self.tap = tap
+        self.view = view
+        self.meters = meters
+        self.frame_ns = 1_000_000_000 // fps
+        self.cost = CostEstimate(margin_ns)  # Of drawing one frame
+        self.frames = 0
+        self.skipped = 0      # Frames due but deferred for lack of slack
+        self.stalls = None    # A latency.StallMonitor to report frames to
+        self._last = 0
+
+    def update(self, slack_ns, now=None):
+        if now is None:
+            now = time.monotonic_ns()
+        if now - self._last < self.frame_ns:
+            return False
+        if not self.cost.fits(slack_ns):
+            self.skipped += 1
+            return False
+
+        self.tap.render(now)
+        if self.view is not None:
+            self.view.update()
+        if self.meters is not None:
+            self.meters.show(self.tap.peak, self.tap.rms)
+
+        cost = time.monotonic_ns() - now
+        self.cost.add(cost)
+        if self.stalls is not None:
+            self.stalls.check(cost // 1_000_000, "scope")
+        self.frames += 1
+        self._last = now
+        return True
+
+    async def run(self, slack, on_frame=None, retry_ms=5):
+        """Update every frame from a task of its own. slack() returns the
+        ns left before the next step; on_frame() is called after each
+        frame drawn, to mark and refresh the display."""
+        frame_ms = self.frame_ns // 1_000_000
+        while True:
+            if self.update(slack()):
+                if on_frame is not None:
+                    on_frame()
+                await asyncio.sleep_ms(frame_ms)
+            else:
+                # Not due yet, or too close to a step; look again soon
+                await asyncio.sleep_ms(retry_ms)
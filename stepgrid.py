@@ -0,0 +1,97 @@
+import displayio
+
+# Step grid
+#
+# The whole pattern is one displayio.TileGrid, one tile per step, backed by
+# a small sprite sheet. Toggling a step is a single tile index write, so
+# displayio only redraws that cell and nothing is allocated.
+#
+# The playhead is a second, one column TileGrid over the grid showing the
+# playhead tile (a frame with a transparent middle). Moving it is one x
+# write no matter how many tracks or steps there are, and displayio only
+# redraws the column it left and the one it moved to.
+
+OFF = 0
+ON = 1
+PLAYHEAD = 2
+
+
+class StepGrid(displayio.TileGrid):
+    def __init__(self, tracks, steps, x=0, y=0, width=220, height=105,
+                 color=0xFF0000, playhead_color=0xFFFFFF):
+        self.tracks = tracks
+        self.steps = steps
+        self.tile_w = max(width // steps, 3)
+        self.tile_h = max(height // tracks, 3)
+
+        self.palette = displayio.Palette(3)
+        self.palette[0] = 0x000000
+        self.palette.make_transparent(0)
+        self.palette[1] = color
+        self.palette[2] = playhead_color
+
+        self.sheet = self._build_sheet()
+
+        super().__init__(
+            self.sheet,
+            pixel_shader=self.palette,
+            width=steps,
+            height=tracks,
+            tile_width=self.tile_w,
+            tile_height=self.tile_h,
+            default_tile=OFF,
+            x=x,
+            y=y,
+        )
+
+        self.playhead = displayio.TileGrid(
+            self.sheet,
+            pixel_shader=self.palette,
+            width=1,
+            height=tracks,
+            tile_width=self.tile_w,
+            tile_height=self.tile_h,
+            default_tile=PLAYHEAD,
+            x=x,
+            y=y,
+        )
+        self.playhead_step = 0
+
+    def _build_sheet(self):
+        # Sprite sheet of three tiles side by side: off, on, playhead
+        tw = self.tile_w
+        th = self.tile_h
+        sheet = displayio.Bitmap(tw * 3, th, 3)
+
+        cx = (tw - 1) / 2
+        cy = (th - 1) / 2
+        r = max(min(tw, th) // 2 - 2, 1)
+        r_out = (r + 0.5) * (r + 0.5)
+        r_in = (r - 0.5) * (r - 0.5)
+        for py in range(th):
+            for px in range(tw):
+                d = (px - cx) * (px - cx) + (py - cy) * (py - cy)
+                if d <= r_out:
+                    sheet[tw * ON + px, py] = 1
+                    if d >= r_in:
+                        sheet[tw * OFF + px, py] = 1
+                # Playhead tile is a frame around the cell
+                if px == 0 or py == 0 or px == tw - 1 or py == th - 1:
+                    sheet[tw * PLAYHEAD + px, py] = 2
+        return sheet
+
+    def set_cell(self, track, step, on):
+        self[step, track] = ON if on else OFF
+
+    def set_playhead(self, step):
+        """Move the playhead overlay to step. Add grid.playhead to the
+        display group above the grid to show it."""
+        if step != self.playhead_step:
+            self.playhead_step = step
+            self.playhead.x = self.x + step * self.tile_w
+
+    def load(self, seq):
+        """Redraw every cell from a pattern.Pattern."""
+        for track in range(self.tracks):
+            for step in range(self.steps):
+                self.set_cell(track, step, seq.get(track, step))
@@ -0,0 +1,127 @@
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# Shared synthesizer voice pool
+#
+# All synth drums play on one synthio.Synthesizer, so one render loop runs
+# however many drums there are, instead of one per drum plus the mixing.
+# The synthesizer has a fixed number of note channels (12 on CircuitPython)
+# and drops notes pressed beyond that, and a drum whose envelope has
+# decayed to silence still holds its channels until it is released. The
+# pool keeps a budget of channels: it releases each hit once its envelopes
+# have run out, and when a hit does not fit it steals the channels of the
+# lowest priority voice sounding and, between equals, the oldest hit. A
+# hit is dropped rather than stealing from a higher priority voice.
+#
+# A voice is any object with a chord tuple of Notes and a
+# play(synth, amplitude) method, like the drums in drums.py. Retriggering
+# a voice that is still sounding reuses its channels. Levels per voice
+# are applied through the Notes' amplitude, so the synthesizer needs only
+# one mixer voice.
+
+CHANNELS = 12
+
+
+def hold_ms(chord):
+    """How long a chord sounds once pressed, in ms, or -1 if it sustains
+    until released."""
+    longest = 0
+    for note in chord:
+        env = note.envelope
+        if env is None or env.sustain_level:
+            return -1
+        t = env.attack_time + env.decay_time + env.release_time
+        if t > longest:
+            longest = t
+    return int(longest * 1000) + 1
+
+
+class VoicePool:
+    def __init__(self, synth, voices, priorities=None, budget=CHANNELS):
+        self.synth = synth
+        self.voices = voices
+        n = len(voices)
+        # Higher plays over lower; by default later voices win
+        self.priorities = list(range(n)) if priorities is None else list(priorities)
+        self.levels = [1.0] * n
+        self.budget = budget
+
+        # Per voice: the chord it pressed, how long that sounds, when it
+        # was pressed and whether it still holds its channels
+        self._chords = [None] * n
+        self._hold = [0] * n
+        self._started = [0] * n
+        self._active = bytearray(n)
+        self.used = 0        # Channels held now
+        self.peak = 0        # Most channels held at once
+        self.hits = 0
+        self.steals = 0
+        self.dropped = 0
+
+    def set_level(self, index, level):
+        self.levels[index] = level
+
+    def _release(self, i):
+        self.synth.release(self._chords[i])
+        self._active[i] = 0
+        self.used -= len(self._chords[i])
+
+    def update(self, now=None):
+        """Release voices whose envelopes have run out. Call once a loop
+        pass, or let play() catch up."""
+        if not self.used:
+            return
+        if now is None:
+            now = ticks_ms()
+        for i in range(len(self.voices)):
+            if self._active[i] and self._hold[i] >= 0 and ticks_diff(now, self._started[i]) >= self._hold[i]:
+                self._release(i)
+
+    def _victim(self, priority):
+        """The active voice to steal for a hit at priority, or -1."""
+        victim = -1
+        for i in range(len(self.voices)):
+            if not self._active[i] or self.priorities[i] > priority:
+                continue
+            if (victim < 0 or self.priorities[i] < self.priorities[victim]
+                    or (self.priorities[i] == self.priorities[victim]
+                        and ticks_diff(self._started[i], self._started[victim]) < 0)):
+                victim = i
+        return victim
+
+    def play(self, index, amplitude=1.0):
+        """Play voice index at amplitude (0 to 1, times its level). Returns
+        False if the hit was dropped for lack of channels."""
+        voice = self.voices[index]
+        now = ticks_ms()
+        self.update(now)
+
+        chord = voice.chord
+        if self._active[index] and chord is not self._chords[index]:
+            # Its notes were rebuilt (HighHat.setTime) while the old ones sound
+            self._release(index)
+        if not self._active[index]:
+            need = len(chord)
+            while self.used + need > self.budget:
+                victim = self._victim(self.priorities[index])
+                if victim < 0:
+                    self.dropped += 1
+                    return False
+                self._release(victim)
+                self.steals += 1
+            if chord is not self._chords[index]:
+                self._chords[index] = chord
+                self._hold[index] = hold_ms(chord)
+            self._active[index] = 1
+            self.used += need
+            if self.used > self.peak:
+                self.peak = self.used
+
+        level = self.levels[index]
+        voice.play(self.synth, amplitude if level == 1.0 else amplitude * level)
+        self._started[index] = now
+        self.hits += 1
+        return True
+
+    def stats(self):
+        return "voices: {} of {} channels, peak {}, {} hits, {} stolen, {} dropped".format(
+            self.used, self.budget, self.peak, self.hits, self.steals, self.dropped)